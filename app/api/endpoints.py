@@ -1,13 +1,26 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Any
 from datetime import datetime
 import logging
+from app.backend import export
+from app.backend.async_db import async_db
+from app.backend.dashboard import dashboard_snapshots
 from app.backend.database import DatabaseManager
+from app.backend.ingest import evaluate_threshold, ingest_readings, prepare_readings
+from app.backend.ingest_queue import IngestQueueFull, IngestQueueStopped, ingest_queue
+from app.backend.live_updates import live_updates
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 router = APIRouter()
+MAX_BATCH_SIZE = 10000
+WRITE_BEHIND_INGEST = True
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
 
 
 class SensorDataIngest(BaseModel):
@@ -16,8 +29,33 @@ class SensorDataIngest(BaseModel):
     raw: Optional[str] = None
 
 
+class SensorReadingItem(BaseModel):
+    sensor_id: int
+    value: float
+    timestamp: Optional[str] = None
+    raw: Optional[str] = None
+
+
+class SensorDataBatch(BaseModel):
+    readings: list[SensorReadingItem]
+
+
+class SensorReadingResult(BaseModel):
+    index: int
+    sensor_id: int
+    status: str
+    message: str
+
+
+class SensorDataBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    alerts_created: int
+    results: list[SensorReadingResult]
+
+
 class SensorDataResponse(BaseModel):
-    id: int
+    id: Optional[int]
     status: str
     message: str
 
@@ -33,33 +71,49 @@ async def ingest_sensor_data(sensor_id: int, payload: SensorDataIngest):
     """
     Ingest data for a specific sensor.
 
-    - Validates sensor existence.
+    - Validates sensor existence (cached sensor registry).
     - Checks thresholds and automatically creates alerts.
-    - Inserts data record.
+    - Queues the record for the write-behind writer (or inserts it directly
+      when WRITE_BEHIND_INGEST is off). Returns 429 when the queue is full.
     """
-    sensor = DatabaseManager.get_sensor_by_id(sensor_id)
+    sensor = await async_db.get_cached_sensor(sensor_id)
     if not sensor:
         raise HTTPException(
             status_code=404, detail=f"Sensor with ID {sensor_id} not found."
         )
     val = payload.value
     timestamp = payload.timestamp or datetime.now().isoformat()
-    if sensor["threshold_high"] is not None and val > sensor["threshold_high"]:
-        DatabaseManager.create_alert(
-            sensor_id=sensor_id,
-            type_="THRESHOLD_HIGH",
-            message=f"Value {val} exceeded high threshold {sensor['threshold_high']}",
-            timestamp=timestamp,
-        )
-    elif sensor["threshold_low"] is not None and val < sensor["threshold_low"]:
-        DatabaseManager.create_alert(
+    if WRITE_BEHIND_INGEST:
+        row = {
+            "sensor_id": sensor_id,
+            "value": val,
+            "raw": payload.raw,
+            "timestamp": timestamp,
+        }
+        readings, alerts, _ = prepare_readings([row], {sensor_id: sensor})
+        try:
+            await ingest_queue.put(readings, alerts)
+        except IngestQueueFull as e:
+            raise HTTPException(
+                status_code=429, detail=str(e), headers={"Retry-After": "1"}
+            )
+        except IngestQueueStopped as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return {
+            "id": None,
+            "status": "queued",
+            "message": "Data queued for ingestion.",
+        }
+    alert = evaluate_threshold(sensor, val)
+    if alert:
+        await async_db.create_alert(
             sensor_id=sensor_id,
-            type_="THRESHOLD_LOW",
-            message=f"Value {val} dropped below low threshold {sensor['threshold_low']}",
+            type_=alert[0],
+            message=alert[1],
             timestamp=timestamp,
         )
     try:
-        record_id = DatabaseManager.insert_sensor_data(
+        record_id = await async_db.insert_sensor_data(
             sensor_id=sensor_id, value=val, raw=payload.raw, timestamp=timestamp
         )
         return {
@@ -72,6 +126,86 @@ async def ingest_sensor_data(sensor_id: int, payload: SensorDataIngest):
         raise HTTPException(status_code=500, detail=f"Failed to ingest data: {str(e)}")
 
 
+@router.post("/sensors/data:batch", response_model=SensorDataBatchResponse)
+async def ingest_sensor_data_batch(payload: SensorDataBatch):
+    """
+    Ingest many readings (possibly for many sensors) in one request.
+
+    - Validates all sensor IDs with a single lookup.
+    - Evaluates thresholds in memory.
+    - Writes every reading and alert in one transaction (queued as one
+      frame when WRITE_BEHIND_INGEST is on). Returns 429 when the queue is full.
+    - Returns a status entry per row; unknown sensors are rejected individually.
+    """
+    if len(payload.readings) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.readings)} > {MAX_BATCH_SIZE} readings.",
+        )
+    rows = [r.model_dump() for r in payload.readings]
+    try:
+        if WRITE_BEHIND_INGEST:
+            return await ingest_queue.submit(rows)
+        return await async_db.run(ingest_readings, rows)
+    except IngestQueueFull as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "1"}
+        )
+    except IngestQueueStopped as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Failed to ingest batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to ingest batch: {str(e)}")
+
+
+def history_stream_response(
+    sensor_ids: list[int],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    fmt: str,
+) -> StreamingResponse:
+    """
+    Streams raw history for sensors as NDJSON or CSV with constant memory.
+    Each chunk is read and encoded on the database executor; the row
+    iterator checks a connection out per page, so no connection is held
+    while the client reads.
+    """
+    rows = DatabaseManager.iter_sensor_data(sensor_ids, start_date, end_date)
+    if fmt == "csv":
+        return StreamingResponse(
+            async_db.iterate(export.encode_csv(rows)),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="sensor_data.csv"'},
+        )
+    return StreamingResponse(
+        async_db.iterate(export.encode_ndjson(rows)),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/sensors/data:stream")
+async def stream_sensors_history(
+    sensor_id: list[int] = Query(..., description="Sensor IDs (repeatable)"),
+    start_date: Optional[str] = Query(
+        None, alias="from", description="Start date (ISO 8601)"
+    ),
+    end_date: Optional[str] = Query(
+        None, alias="to", description="End date (ISO 8601)"
+    ),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """
+    Stream the raw history of several sensors over any range as NDJSON or
+    CSV, ordered by sensor then time. Rows are fetched and encoded in
+    batches, so the response size is not limited by server memory.
+    """
+    sensors = await async_db.get_sensors_by_ids(sensor_id)
+    missing = [sid for sid in sensor_id if sid not in sensors]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Sensors not found: {missing}")
+    return history_stream_response(sensor_id, start_date, end_date, format)
+
+
 @router.get("/sensors/{sensor_id}/data")
 async def get_sensor_history(
     sensor_id: int,
@@ -82,31 +216,94 @@ async def get_sensor_history(
         None, alias="to", description="End date (ISO 8601)"
     ),
     limit: int = Query(100, ge=1, le=1000, description="Max records to return"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous X-Next-Cursor header"
+    ),
+    downsample: Optional[str] = Query(
+        None,
+        pattern="^(lttb|minmax)$",
+        description="Downsample the whole range instead of returning the newest rows",
+    ),
+    points: int = Query(
+        500, ge=3, le=10000, description="Max points when downsampling"
+    ),
+    format: Optional[str] = Query(
+        None,
+        pattern="^(ndjson|csv)$",
+        description="Stream the whole range (oldest first) instead of a page",
+    ),
+    response: Response = None,
 ):
     """
     Get historical data for a sensor with optional date filtering.
+
+    Without `downsample`, returns the newest `limit` raw rows (newest first).
+    When more rows exist, the `X-Next-Cursor` response header holds a cursor;
+    pass it back as `cursor` to get the next page at constant cost.
+    With `downsample=lttb|minmax`, returns at most `points` representative
+    {timestamp, value} points across the whole range (oldest first).
+    With `format=ndjson|csv`, streams every raw row in the range (oldest
+    first, no `limit`) with constant memory.
     """
-    sensor = DatabaseManager.get_sensor_by_id(sensor_id)
+    sensor = await async_db.get_sensor_by_id(sensor_id)
     if not sensor:
         raise HTTPException(
             status_code=404, detail=f"Sensor with ID {sensor_id} not found."
         )
+    if format:
+        return history_stream_response([sensor_id], start_date, end_date, format)
     try:
-        data = DatabaseManager.get_sensor_data_history(
-            sensor_id, start_date, end_date, limit
+        if downsample:
+            return await async_db.get_sensor_history_downsampled(
+                sensor_id, start_date, end_date, points, downsample
+            )
+        page = await async_db.get_sensor_data_page(
+            sensor_id, limit, cursor, start_date, end_date
         )
-        return data
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return page["items"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception(f"Failed to get sensor history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/export/sensor-data")
+async def export_sensor_data(
+    start_date: Optional[str] = Query(None, description="ISO start date (inclusive)"),
+    end_date: Optional[str] = Query(None, description="ISO end date (inclusive)"),
+    sensor_id: Optional[list[int]] = Query(
+        None, description="Sensor IDs (repeatable); all sensors when omitted"
+    ),
+    format: str = Query("parquet", pattern="^(parquet|arrow)$"),
+):
+    """
+    Stream sensor_data for a time window and sensor set as a compressed
+    Parquet file or an Arrow IPC stream, written batch by batch so memory
+    stays bounded for any range.
+    """
+    if export.pa is None:
+        raise HTTPException(
+            status_code=501, detail="Columnar export requires pyarrow on the server."
+        )
+    media_type, suffix = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        async_db.iterate(
+            export.stream_sensor_data(format, start_date, end_date, sensor_id)
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sensor_data.{suffix}"'},
+    )
+
+
 @router.get("/parcels", response_model=list[ParcelResponse])
 async def list_parcels():
     """
     List all registered parcels.
     """
-    return DatabaseManager.get_parcels()
+    return await async_db.get_parcels()
 
 
 @router.get("/parcels/{id}/sensors")
@@ -114,29 +311,93 @@ async def get_parcel_sensors(id: int):
     """
     Get all sensors associated with a specific parcel.
     """
-    parcel = DatabaseManager.get_parcel_by_id(id)
+    parcel = await async_db.get_parcel_by_id(id)
     if not parcel:
         raise HTTPException(status_code=404, detail=f"Parcel with ID {id} not found.")
-    return DatabaseManager.get_sensors_by_parcel(id)
+    return await async_db.get_sensors_by_parcel(id)
+
+
+@router.get("/devices")
+async def list_devices():
+    """
+    List registered MAIoTA devices (MQTT topic -> parcel).
+    """
+    return await async_db.get_devices()
+
+
+@router.get("/devices/mappings")
+async def get_device_mappings(topic: Optional[str] = None):
+    """
+    Device topic -> {sensor type: sensor ID}, for remote MQTT connectors.
+    Pass `topic` to resolve a single device.
+    """
+    return await async_db.get_device_sensor_map(topic)
 
 
 @router.get("/dashboard")
-async def get_dashboard_summary():
+async def get_dashboard_summary(
+    version: Optional[int] = Query(
+        None, description="Snapshot version the client already holds"
+    ),
+):
     """
-    Get a summary for the main dashboard:
+    Get a summary for the main dashboard from the shared snapshot:
     - Latest readings for all sensors
     - Unacknowledged alerts
     - System statistics
+    - Parcels with enriched sensors and sparklines
+    Returns only {"version", "unchanged": true} when `version` is current.
     """
     try:
-        latest_readings = DatabaseManager.get_latest_readings()
-        active_alerts = DatabaseManager.get_unacknowledged_alerts()
-        stats = DatabaseManager.get_system_stats()
-        return {
-            "stats": stats,
-            "latest_readings": latest_readings,
-            "active_alerts": active_alerts,
-        }
+        snapshot = await async_db.run(dashboard_snapshots.get)
     except Exception as e:
         logger.exception(f"Failed to get dashboard summary: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    if version == snapshot["version"]:
+        return {"version": version, "unchanged": True}
+    return {
+        "version": snapshot["version"],
+        "built_at": snapshot["built_at"],
+        "stats": snapshot["stats"],
+        "latest_readings": snapshot["latest_readings"],
+        "active_alerts": snapshot["active_alerts"],
+        "parcels": snapshot["parcels"],
+        "sparkline_seq": snapshot["sparkline_seq"],
+    }
+
+
+@router.get("/dashboard/sparklines")
+async def get_dashboard_sparklines(
+    since: int = Query(
+        0, ge=0, description="Last sparkline sequence number the client holds"
+    ),
+):
+    """
+    Get only the sparkline points added after `since`:
+    {"seq": current, "points": {sensor_id: [[seq, timestamp, value], ...]}}.
+    Pass the returned `seq` as `since` on the next call.
+    """
+    return await async_db.get_sparkline_delta(since)
+
+
+@router.get("/system/metrics")
+async def get_system_metrics():
+    """
+    Get internal performance counters:
+    - Database connection pool (hit rate, wait time, open connections)
+    - Sensor registry cache (hits, misses, invalidations)
+    - Write-behind ingest queue (depth, flush latency, rejections)
+    - Database executor (queue time vs. query time per DatabaseManager call)
+    - Live dashboard updates (version, subscribers)
+    - Shared dashboard snapshot (builds vs. hits)
+    - Sparkline ring buffer (sequence number, sensors)
+    """
+    return {
+        "db_pool": DatabaseManager.get_pool_stats(),
+        "sensor_cache": DatabaseManager.get_sensor_cache_stats(),
+        "ingest_queue": ingest_queue.stats(),
+        "db_executor": async_db.stats(),
+        "live_updates": live_updates.stats(),
+        "dashboard_snapshot": dashboard_snapshots.stats(),
+        "sparklines": DatabaseManager.get_sparkline_stats(),
+    }
@@ -6,6 +6,8 @@ from app.states.auth_state import AuthState
 from app.states.db_state import DatabaseState
 from app.states.parcels_state import ParcelsState
 from app.api.endpoints import router as api_router
+from app.backend.ingest_queue import ingest_queue_lifespan
+from app.backend.retention import retention_lifespan
 
 
 def api_routes(app):
@@ -22,6 +24,8 @@ app = rx.App(
     ],
     api_transformer=api_routes,
 )
+app.register_lifespan_task(ingest_queue_lifespan)
+app.register_lifespan_task(retention_lifespan)
 app.add_page(login_page, route="/login")
 app.add_page(dashboard, route="/", on_load=[AuthState.on_mount, DatabaseState.on_mount])
 from app.pages.system import system_page
@@ -45,4 +49,4 @@ from app.pages.analytics import analytics_page
 from app.pages.alerts import alerts_page
 
 app.add_page(analytics_page, route="/analytics", on_load=[AuthState.on_mount])
-app.add_page(alerts_page, route="/alerts", on_load=[AuthState.on_mount])
\ No newline at end of file
+app.add_page(alerts_page, route="/alerts", on_load=[AuthState.on_mount])
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from app.backend.database import DatabaseManager, DB_POOL_SIZE
+
+DB_EXECUTOR_WORKERS = max(1, DB_POOL_SIZE // 2)
+
+
+class AsyncDatabaseManager:
+    """
+    Awaitable facade over DatabaseManager for async routes and Reflex events.
+
+    `await async_db.get_parcels()` runs DatabaseManager.get_parcels on a
+    dedicated, size-limited thread pool so blocking sqlite3 calls never run
+    on the event loop. Each call records how long it waited for a worker
+    (queue time) and how long the query itself took.
+    """
+
+    def __init__(self, max_workers: int = DB_EXECUTOR_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+        self._lock = threading.Lock()
+        self._calls: dict[str, dict] = {}
+        self._in_flight = 0
+
+    def __getattr__(self, name: str) -> Callable:
+        target = getattr(DatabaseManager, name)
+        if not callable(target):
+            raise AttributeError(name)
+
+        @functools.wraps(target)
+        async def call(*args, **kwargs):
+            return await self.run(target, *args, **kwargs)
+
+        return call
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Runs a blocking callable on the database executor."""
+        submitted = time.perf_counter()
+        timing = {}
+
+        def timed():
+            timing["started"] = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing["finished"] = time.perf_counter()
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, timed
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # A cancelled await leaves the call running; it is not timed.
+            if "finished" in timing:
+                self._record(
+                    getattr(fn, "__name__", repr(fn)),
+                    timing["started"] - submitted,
+                    timing["finished"] - timing["started"],
+                )
+
+    async def iterate(self, iterator: Iterator) -> AsyncIterator:
+        """
+        Drives a blocking iterator (a DatabaseManager.iter_* stream or an
+        encoder over one) on the database executor, one item per call, so
+        streaming responses share the executor and its stats.
+        """
+        done = object()
+        # Held while the iterator runs, so a close never overlaps a next()
+        # still running on a worker after the consumer went away.
+        running = threading.Lock()
+
+        def next_chunk():
+            with running:
+                return next(iterator, done)
+
+        try:
+            while True:
+                item = await self.run(next_chunk)
+                if item is done:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+
+                def close_iterator():
+                    with running:
+                        close()
+
+                # Off the loop: closing may run the iterator's cleanup.
+                self._executor.submit(close_iterator)
+
+    def _record(self, name: str, queue_time: float, query_time: float):
+        with self._lock:
+            entry = self._calls.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "queue_ms_total": 0.0,
+                    "queue_ms_max": 0.0,
+                    "query_ms_total": 0.0,
+                    "query_ms_max": 0.0,
+                },
+            )
+            entry["calls"] += 1
+            entry["queue_ms_total"] += queue_time * 1000
+            entry["queue_ms_max"] = max(entry["queue_ms_max"], queue_time * 1000)
+            entry["query_ms_total"] += query_time * 1000
+            entry["query_ms_max"] = max(entry["query_ms_max"], query_time * 1000)
+
+    def stats(self) -> dict:
+        """Executor queue time vs. query time, overall and per method."""
+        with self._lock:
+            methods = {name: dict(entry) for name, entry in self._calls.items()}
+            in_flight = self._in_flight
+        totals = {"calls": 0, "queue_ms_total": 0.0, "query_ms_total": 0.0}
+        for entry in methods.values():
+            for key in totals:
+                totals[key] += entry[key]
+            entry["queue_ms_avg"] = entry["queue_ms_total"] / entry["calls"]
+            entry["query_ms_avg"] = entry["query_ms_total"] / entry["calls"]
+        calls = totals["calls"]
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": in_flight,
+            "calls": calls,
+            "queue_ms_avg": totals["queue_ms_total"] / calls if calls else 0.0,
+            "query_ms_avg": totals["query_ms_total"] / calls if calls else 0.0,
+            "methods": methods,
+        }
+
+
+async_db = AsyncDatabaseManager()
@@ -0,0 +1,252 @@
+"""
+Micro-benchmarks for hot in-process code paths (no database needed).
+
+    python -m app.backend.benchmarks dashboard --sensors 10000
+    python -m app.backend.benchmarks parser --frames 20000 --noise 0.2
+"""
+
+import argparse
+import io
+import logging
+import random
+import timeit
+from app.backend.dashboard import enrich_parcels, sensor_status
+from app.backend.maiota_parser import frame_values, parse_payload, parse_payloads
+from app.backend.sparklines import SPARKLINE_POINTS
+
+PARSER_TARGET_SPEEDUP = 10.0
+
+
+def _dashboard_fixture(parcel_count: int, sensor_count: int, seed: int = 1):
+    rng = random.Random(seed)
+    parcels = [
+        {"id": i, "name": f"Parcel {i}", "location": "Field"}
+        for i in range(1, parcel_count + 1)
+    ]
+    sensors = []
+    readings_map = {}
+    history_map = {}
+    for sensor_id in range(1, sensor_count + 1):
+        sensors.append(
+            {
+                "id": sensor_id,
+                "parcel_id": rng.randint(1, parcel_count),
+                "type": "temperature",
+                "unit": "C",
+                "description": f"Sensor {sensor_id}",
+                "threshold_low": rng.choice([None, 5.0]),
+                "threshold_high": rng.choice([None, 35.0]),
+            }
+        )
+        if rng.random() < 0.9:
+            value = rng.uniform(0, 40)
+            readings_map[sensor_id] = {
+                "sensor_id": sensor_id,
+                "value": value,
+                "timestamp": "2024-01-01T00:00:00",
+            }
+            history_map[sensor_id] = [
+                {"value": value, "timestamp": f"2024-01-01T00:00:{i:02d}"}
+                for i in range(SPARKLINE_POINTS)
+            ]
+    return parcels, sensors, readings_map, history_map
+
+
+def _enrich_parcels_naive(parcels, sensors, readings_map, history_map):
+    # The previous per-parcel filter: O(parcels x sensors).
+    enriched_parcels = []
+    for p in parcels:
+        enriched_sensors = []
+        for s in [s for s in sensors if s["parcel_id"] == p["id"]]:
+            reading = readings_map.get(s["id"])
+            val = reading["value"] if reading else None
+            if reading:
+                status, status_color = sensor_status(s, val)
+            else:
+                status, status_color = ("inactive", "gray")
+            enriched_sensors.append(
+                {
+                    **s,
+                    "current_value": val,
+                    "latest_timestamp": reading["timestamp"] if reading else None,
+                    "status": status,
+                    "status_color": status_color,
+                    "history": list(history_map.get(s["id"], [])),
+                }
+            )
+        enriched_parcels.append({**p, "sensors": enriched_sensors})
+    return enriched_parcels
+
+
+def bench_dashboard(args: argparse.Namespace):
+    fixture = _dashboard_fixture(args.parcels, args.sensors)
+    if enrich_parcels(*fixture) != _enrich_parcels_naive(*fixture):
+        raise SystemExit("enrich_parcels output differs from the reference.")
+    print(f"{args.parcels} parcels, {args.sensors} sensors, best of {args.repeat}:")
+    for name, fn in (
+        ("enrich_parcels", enrich_parcels),
+        ("naive", _enrich_parcels_naive),
+    ):
+        best = min(timeit.repeat(lambda: fn(*fixture), number=1, repeat=args.repeat))
+        print(f"  {name:<16} {best * 1000:9.1f} ms")
+
+
+_reference_logger = logging.getLogger(f"{__name__}.reference")
+
+
+def _parse_reference(payload: str) -> dict[str, float]:
+    # The previous split/replace parser with an if/elif chain over D1..D7.
+    results = {}
+    try:
+        if "Payload=" in payload:
+            payload = payload.split("Payload=")[1]
+        clean_payload = payload.strip().rstrip("&")
+        parts = clean_payload.split("&")
+        raw_values = {}
+        for part in parts:
+            if "=" in part:
+                key, value = part.split("=", 1)
+                clean_val_str = value.replace("↓", "").replace("%", "").strip()
+                try:
+                    raw_values[key] = float(clean_val_str)
+                except ValueError:
+                    _reference_logger.exception(
+                        f"Could not parse value '{value}' for key '{key}'"
+                    )
+                    continue
+        for key, val in raw_values.items():
+            k = key.split("-")[-1].strip() if "-" in key else key.strip()
+            if k == "D1":
+                results["temperature"] = val / 100.0
+            elif k == "D2":
+                results["humidity"] = val / 100.0
+            elif k == "D3":
+                results["soil_moisture"] = val / 100.0
+            elif k == "D4":
+                results["light"] = val / 10.0
+            elif k == "D5":
+                results["co2"] = val
+            elif k == "D6":
+                results["cov"] = val
+            elif k == "D7":
+                results["nox"] = val
+        return results
+    except Exception as e:
+        _reference_logger.exception(f"Failed to parse payload '{payload}': {e}")
+        return {}
+
+
+def _maiota_frame(rng: random.Random) -> str:
+    soil = rng.randint(2000, 6000)
+    values = [
+        rng.randint(500, 4500),
+        rng.randint(2000, 9999),
+        f"↓{soil}" if soil < 2465 else soil,
+        rng.randint(0, 9999),
+        rng.randint(400, 5000),
+        rng.randint(0, 500),
+        rng.randint(0, 9),
+    ]
+    return "Payload=CIoTA-" + "".join(f"D{i}={v}&" for i, v in enumerate(values, 1))
+
+
+def fuzz_corpus(count: int, noise: float, seed: int = 1) -> list[str]:
+    """
+    MAIoTA payloads: well-formed frames (with the ↓ soil moisture marker)
+    and, for a `noise` fraction, % suffixes, spacing, truncated frames,
+    unknown keys, garbage values, missing fields and a missing prefix or
+    trailing &.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        frame = _maiota_frame(rng)
+        if rng.random() < noise:
+            kind = rng.randrange(6)
+            if kind == 0:
+                frame = frame[: rng.randrange(len(frame))]
+            elif kind == 1:
+                frame = frame.replace("&D2=", "&D2= ").replace("&D4", "%&D4", 1)
+                frame = frame.replace("&D4=", "&D4=↓", 1) + " %"
+            elif kind == 2:
+                frame = frame.replace("D5=", "D5=x", 1)
+            elif kind == 3:
+                frame = frame + rng.choice(["D8=12&", "D0=&", "Dx=1&", "&&"])
+            elif kind == 4:
+                frame = frame.split("Payload=")[1].rstrip("&")
+            else:
+                # Garbage value plus a missing field.
+                head, _, tail = frame.partition("&D4=")
+                frame = head.replace("D2=", "D2=--", 1) + "&" + tail.split("&", 1)[1]
+        corpus.append(frame)
+    return corpus
+
+
+def bench_parser(args: argparse.Namespace):
+    # The connector logs to stdout; keep that cost without the console spam.
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    _reference_logger.addHandler(handler)
+    _reference_logger.propagate = False
+    for noise in sorted({0.0, args.noise}):
+        corpus = fuzz_corpus(args.frames, noise)
+        for payload in corpus:
+            if frame_values(parse_payload(payload)) != _parse_reference(payload):
+                raise SystemExit(
+                    f"parse_payload differs from the reference: {payload!r}"
+                )
+        if parse_payloads(corpus) != [parse_payload(p) for p in corpus]:
+            raise SystemExit("parse_payloads differs from parse_payload.")
+        print(f"{args.frames} frames, {noise:.0%} noisy, best of {args.repeat}:")
+        rates = {}
+        for name, fn in (
+            ("parse_payloads", lambda: parse_payloads(corpus)),
+            ("parse_payload", lambda: [parse_payload(p) for p in corpus]),
+            ("reference", lambda: [_parse_reference(p) for p in corpus]),
+        ):
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            rates[name] = args.frames / best
+        for name, rate in rates.items():
+            print(
+                f"  {name:<16} {rate:12,.0f} frames/s "
+                f"({rate / rates['reference']:.1f}x reference)"
+            )
+        # Goal: 10x the reference; not reached. Measured over 20000 frames
+        # (best of 5, several runs): parse_payloads 3.5-5.6x clean and
+        # 5.1-7.1x at 20% noise, parse_payload 1.4-2.2x and 3.6-4.8x.
+        # Splitting frames into strings and boxing the floats bounds any
+        # CPython parser near 1 us per frame; the reference takes 6-9 us.
+        speedup = rates["parse_payloads"] / rates["reference"]
+        verdict = "meets" if speedup >= PARSER_TARGET_SPEEDUP else "misses"
+        print(
+            f"  parse_payloads is {speedup:.1f}x the reference, "
+            f"{verdict} the {PARSER_TARGET_SPEEDUP:.0f}x target"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.backend.benchmarks",
+        description="Agrotech micro-benchmarks.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    cmd = commands.add_parser("dashboard", help="Dashboard tree enrichment.")
+    cmd.add_argument("--parcels", type=int, default=500)
+    cmd.add_argument("--sensors", type=int, default=10000)
+    cmd.add_argument("--repeat", type=int, default=5)
+    cmd.set_defaults(handler=bench_dashboard)
+    cmd = commands.add_parser("parser", help="MAIoTA payload parsing.")
+    cmd.add_argument("--frames", type=int, default=20000)
+    cmd.add_argument("--noise", type=float, default=0.2)
+    cmd.add_argument("--repeat", type=int, default=5)
+    cmd.set_defaults(handler=bench_parser)
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
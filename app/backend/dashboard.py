@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from app.backend.database import DatabaseManager
+from app.backend.live_updates import live_updates
+
+DASHBOARD_SNAPSHOT_TTL = 30.0
+
+
+# (status, status_color) by status code; see _status_code.
+SENSOR_STATUSES = (
+    ("inactive", "gray"),
+    ("active", "green"),
+    ("warning", "yellow"),
+    ("critical", "red"),
+)
+
+
+def _status_code(value: Optional[float], low: float, high: float) -> int:
+    # low/high are -inf/inf when a threshold is unset, so no None checks.
+    if value is None:
+        return 1
+    if value > high:
+        return 3
+    if value < low:
+        return 2
+    return 1
+
+
+def sensor_status(sensor: dict, value: Optional[float]) -> tuple[str, str]:
+    """Returns (status, status_color) for a sensor that has a latest reading."""
+    low = sensor["threshold_low"]
+    high = sensor["threshold_high"]
+    return SENSOR_STATUSES[
+        _status_code(
+            value,
+            -math.inf if low is None else low,
+            math.inf if high is None else high,
+        )
+    ]
+
+
+def enrich_parcels(
+    parcels: list[dict],
+    sensors: list[dict],
+    readings_map: dict[int, dict],
+    history_map: dict[int, list[dict]],
+) -> list[dict]:
+    """
+    Builds the parcel -> sensor tree with latest value, status and sparkline
+    in O(parcels + sensors): sensors are grouped by parcel in one pass and
+    thresholds are normalised up front. History lists are shared, not
+    copied. Sensors of unknown parcels are dropped.
+    """
+    inf = math.inf
+    lows = [-inf if s["threshold_low"] is None else s["threshold_low"] for s in sensors]
+    highs = [
+        inf if s["threshold_high"] is None else s["threshold_high"] for s in sensors
+    ]
+    by_parcel: dict[int, list[dict]] = {p["id"]: [] for p in parcels}
+    no_history: list[dict] = []
+    for s, low, high in zip(sensors, lows, highs):
+        group = by_parcel.get(s["parcel_id"])
+        if group is None:
+            continue
+        s_id = s["id"]
+        reading = readings_map.get(s_id)
+        if reading is None:
+            value = timestamp = None
+            status, status_color = SENSOR_STATUSES[0]
+        else:
+            value = reading["value"]
+            timestamp = reading["timestamp"]
+            status, status_color = SENSOR_STATUSES[_status_code(value, low, high)]
+        group.append(
+            {
+                "id": s_id,
+                "parcel_id": s["parcel_id"],
+                "type": s["type"],
+                "unit": s["unit"],
+                "description": s["description"],
+                "threshold_low": s["threshold_low"],
+                "threshold_high": s["threshold_high"],
+                "current_value": value,
+                "latest_timestamp": timestamp,
+                "status": status,
+                "status_color": status_color,
+                "history": history_map.get(s_id, no_history),
+            }
+        )
+    return [
+        {
+            "id": p["id"],
+            "name": p["name"],
+            "location": p["location"],
+            "sensors": by_parcel[p["id"]],
+        }
+        for p in parcels
+    ]
+
+
+def build_dashboard() -> dict:
+    """
+    Builds the enriched parcel -> sensor -> sparkline tree, the active
+    alerts and the system stats shown on the dashboard. Sparklines are
+    reconciled with the database so out-of-process writes show up too.
+    """
+    sparkline_seq, history_map = DatabaseManager.get_sparklines(reconcile=True)
+    latest_readings = DatabaseManager.get_latest_readings()
+    parcels = enrich_parcels(
+        DatabaseManager.get_parcels(),
+        DatabaseManager.get_sensors(),
+        {r["sensor_id"]: r for r in latest_readings},
+        history_map,
+    )
+    return {
+        "sparkline_seq": sparkline_seq,
+        "parcels": parcels,
+        "latest_readings": latest_readings,
+        "active_alerts": DatabaseManager.get_unacknowledged_alerts(),
+        "stats": DatabaseManager.get_system_stats(),
+    }
+
+
+class DashboardSnapshotCache:
+    """
+    One dashboard snapshot shared by every session and the REST API.
+
+    The snapshot is rebuilt when something was published to the live
+    update hub since it was built (a new ingest generation) or when it is
+    older than `ttl` seconds (covers writes from other processes). Only one
+    caller rebuilds at a time; concurrent callers wait and reuse its result.
+
+    `version` changes only when a rebuild produced different content, so
+    callers holding the current version can skip re-rendering. Snapshots
+    are shared: treat them as read-only.
+    """
+
+    def __init__(self, builder=build_dashboard, ttl: float = DASHBOARD_SNAPSHOT_TTL):
+        self.builder = builder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[dict] = None
+        self._built_at = 0.0
+        self._version = 0
+        self.builds = 0
+        self.hits = 0
+
+    def _fresh_snapshot(self) -> Optional[dict]:
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and snapshot["live_version"] == live_updates.version
+            and time.monotonic() - self._built_at < self.ttl
+        ):
+            self.hits += 1
+            return snapshot
+        return None
+
+    def get(self) -> dict:
+        """
+        Returns {"version", "live_version", "built_at", "sparkline_seq", "parcels",
+        "latest_readings", "active_alerts", "stats"}.
+        """
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            snapshot = self._fresh_snapshot()
+            if snapshot is not None:
+                return snapshot
+            live_version = live_updates.version
+            built_at = time.monotonic()
+            data = self.builder()
+            self.builds += 1
+            previous = self._snapshot
+            if previous is None or any(previous[k] != v for k, v in data.items()):
+                self._version += 1
+            snapshot = {
+                "version": self._version,
+                "live_version": live_version,
+                "built_at": datetime.now().isoformat(),
+                **data,
+            }
+            self._snapshot = snapshot
+            self._built_at = built_at
+            return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> dict:
+        return {
+            "version": self._version,
+            "builds": self.builds,
+            "hits": self.hits,
+            "ttl": self.ttl,
+        }
+
+
+dashboard_snapshots = DashboardSnapshotCache()
@@ -2,13 +2,331 @@ import sqlite3
 import logging
 import hashlib
 import secrets
+import threading
+import base64
+import json
+import re
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
+from app.backend.db_pool import ConnectionPool, PooledConnection
+from app.backend.storage_profile import StorageProfile, WalCheckpointScheduler
+from app.backend.live_updates import live_updates
+from app.backend.sensor_cache import SensorRegistry
+from app.backend.sparklines import SparklineBuffer
+from app.backend.downsampling import lttb, merge_min_max
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 DB_FILE_NAME = "agrotech_data.db"
+DB_POOL_SIZE = 8
+SQL_IN_CHUNK_SIZE = 500
+FETCH_BATCH_SIZE = 5000
+# Above this many raw points in range, LTTB runs over rollup buckets instead.
+DOWNSAMPLE_MAX_SOURCE_POINTS = 100000
+STORAGE_PROFILE = StorageProfile.from_env()
+_pool: Optional[ConnectionPool] = None
+_checkpointer: Optional[WalCheckpointScheduler] = None
+_pool_lock = threading.Lock()
+
+REBUILD_SENSOR_LATEST_SQL = """
+INSERT OR REPLACE INTO sensor_latest (sensor_id, data_id, value, timestamp)
+SELECT sensor_id, id, value, timestamp
+FROM sensor_data
+WHERE id IN (SELECT MAX(id) FROM sensor_data GROUP BY sensor_id)
+"""
+
+# Rollup resolutions: bucket key = first N chars of the ISO timestamp.
+ROLLUP_RESOLUTIONS: dict[str, dict] = {
+    "1m": {"prefix": 16, "seconds": 60, "suffix": ":00"},
+    "1h": {"prefix": 13, "seconds": 3600, "suffix": ":00:00"},
+    "1d": {"prefix": 10, "seconds": 86400, "suffix": "T00:00:00"},
+}
+
+
+def _rollup_upsert_sql(resolution: str, source: str) -> str:
+    """
+    Upserts readings from `source` (rows of sensor_id, value, timestamp)
+    into sensor_rollups, merging min/max/sum/count/first/last per bucket.
+    """
+    prefix = ROLLUP_RESOLUTIONS[resolution]["prefix"]
+    return f"""
+    INSERT INTO sensor_rollups (
+        sensor_id, resolution, bucket, min_value, max_value, sum_value, count,
+        first_value, first_ts, last_value, last_ts
+    )
+    SELECT sensor_id, '{resolution}', substr(ts, 1, {prefix}),
+        value, value, value, 1, value, ts, value, ts
+    FROM (SELECT sensor_id, value, replace(timestamp, ' ', 'T') AS ts FROM ({source}))
+    WHERE value IS NOT NULL
+    ORDER BY ts
+    ON CONFLICT (sensor_id, resolution, bucket) DO UPDATE SET
+        min_value = min(min_value, excluded.min_value),
+        max_value = max(max_value, excluded.max_value),
+        sum_value = sum_value + excluded.sum_value,
+        count = count + excluded.count,
+        first_value = CASE WHEN excluded.first_ts < first_ts
+            THEN excluded.first_value ELSE first_value END,
+        first_ts = min(first_ts, excluded.first_ts),
+        last_value = CASE WHEN excluded.last_ts >= last_ts
+            THEN excluded.last_value ELSE last_value END,
+        last_ts = max(last_ts, excluded.last_ts)
+    """
+
+
+def _merge_rollup_rows(rows: list[tuple]) -> tuple:
+    """
+    Merges consecutive (bucket, min, max, sum, count, first, last) rollup
+    rows into one, keyed by the first bucket.
+    """
+    return (
+        rows[0][0],
+        min(row[1] for row in rows),
+        max(row[2] for row in rows),
+        sum(row[3] for row in rows),
+        sum(row[4] for row in rows),
+        rows[0][5],
+        rows[-1][6],
+    )
+
+
+# Per table: the rows that may expire and, for sensor_data, the query listing
+# the sensor IDs to purge one at a time so every batch is an index range
+# (sensor_id, timestamp) instead of a scan. The cutoff is the last parameter.
+RETENTION_TARGETS = {
+    "sensor_data": (
+        "sensor_id = ? AND timestamp < ?",
+        "SELECT id FROM sensors UNION SELECT sensor_id FROM sensor_latest",
+    ),
+    "alerts": ("acknowledged = 1 AND timestamp < ?", None),
+    "maiota_records": ("timestamp < ?", None),
+}
+
+SEARCH_COUNT_CAP = 10000
+SEARCH_COUNT_CACHE_SIZE = 256
+_search_count_cache: OrderedDict[str, int] = OrderedDict()
+_search_count_lock = threading.Lock()
+_fts_enabled: Optional[bool] = None
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _create_records_fts(conn: sqlite3.Connection):
+    """
+    Full-text index over maiota_records kept in sync by triggers.
+    Skipped (search falls back to LIKE) when SQLite lacks FTS5.
+    """
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS maiota_records_fts USING fts5(
+                source_key, category, value_str, metadata,
+                content='maiota_records', content_rowid='id'
+            )
+            """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 unavailable, record search will use LIKE: {e}")
+        return
+    # One execute() per trigger: executescript() would commit the migration.
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_maiota_records_fts_ai
+        AFTER INSERT ON maiota_records BEGIN
+            INSERT INTO maiota_records_fts (rowid, source_key, category, value_str, metadata)
+            VALUES (NEW.id, NEW.source_key, NEW.category, NEW.value_str, NEW.metadata);
+        END
+        """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_maiota_records_fts_ad
+        AFTER DELETE ON maiota_records BEGIN
+            INSERT INTO maiota_records_fts (maiota_records_fts, rowid, source_key, category, value_str, metadata)
+            VALUES ('delete', OLD.id, OLD.source_key, OLD.category, OLD.value_str, OLD.metadata);
+        END
+        """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_maiota_records_fts_au
+        AFTER UPDATE ON maiota_records BEGIN
+            INSERT INTO maiota_records_fts (maiota_records_fts, rowid, source_key, category, value_str, metadata)
+            VALUES ('delete', OLD.id, OLD.source_key, OLD.category, OLD.value_str, OLD.metadata);
+            INSERT INTO maiota_records_fts (rowid, source_key, category, value_str, metadata)
+            VALUES (NEW.id, NEW.source_key, NEW.category, NEW.value_str, NEW.metadata);
+        END
+        """)
+    conn.execute(
+        "INSERT INTO maiota_records_fts (maiota_records_fts) VALUES ('rebuild')"
+    )
+
+
+def build_fts_query(search_query: str) -> str:
+    """
+    Turns free text into an FTS5 query: every word becomes a quoted prefix
+    term, all terms required. Returns "" if the text has no word characters.
+    """
+    return " ".join(f'"{token}"*' for token in _FTS_TOKEN_RE.findall(search_query))
+
+
+# Row counts served from the trigger-maintained table_counts table, with the
+# query that computes each one exactly.
+TABLE_COUNTERS = {
+    "parcels": "SELECT COUNT(*) FROM parcels",
+    "sensors": "SELECT COUNT(*) FROM sensors",
+    "unacknowledged_alerts": "SELECT COUNT(*) FROM alerts WHERE acknowledged = 0",
+    "maiota_records": "SELECT COUNT(*) FROM maiota_records",
+}
+
+REBUILD_TABLE_COUNTS_SQL = "INSERT OR REPLACE INTO table_counts (name, value) " + (
+    " UNION ALL ".join(
+        f"SELECT '{name}', ({sql})" for name, sql in TABLE_COUNTERS.items()
+    )
+)
+
+
+def _counter_trigger_sql(name: str, table: str, event: str, delta: str) -> str:
+    """Trigger adding `delta` (an SQL expression) to counter `name` on `event`."""
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_count_{event.split()[0].lower()} "
+        f"AFTER {event} ON {table} BEGIN "
+        f"UPDATE table_counts SET value = value + ({delta}) WHERE name = '{name}'; END"
+    )
+
+
+# Versioned schema changes applied after the base tables exist. The applied
+# version is stored in PRAGMA user_version; append new versions, never edit
+# released ones.
+SCHEMA_MIGRATIONS: list[tuple[int, list[str]]] = [
+    (
+        1,
+        [
+            "CREATE INDEX IF NOT EXISTS idx_sensor_data_sensor_ts ON sensor_data (sensor_id, timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_alerts_ack_ts ON alerts (acknowledged, timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_alerts_sensor_type_ts ON alerts (sensor_id, type, timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_sensors_parcel ON sensors (parcel_id)",
+            "CREATE INDEX IF NOT EXISTS idx_maiota_records_ts ON maiota_records (timestamp)",
+        ],
+    ),
+    (
+        2,
+        [
+            # Latest reading per sensor, maintained in the inserting transaction.
+            """
+            CREATE TABLE IF NOT EXISTS sensor_latest (
+                sensor_id INTEGER PRIMARY KEY,
+                data_id INTEGER NOT NULL,
+                value REAL,
+                timestamp DATETIME
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_sensor_data_latest
+            AFTER INSERT ON sensor_data
+            BEGIN
+                INSERT INTO sensor_latest (sensor_id, data_id, value, timestamp)
+                VALUES (NEW.sensor_id, NEW.id, NEW.value, NEW.timestamp)
+                ON CONFLICT (sensor_id) DO UPDATE SET
+                    data_id = excluded.data_id,
+                    value = excluded.value,
+                    timestamp = excluded.timestamp
+                WHERE excluded.data_id > sensor_latest.data_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_sensors_latest_cleanup
+            AFTER DELETE ON sensors
+            BEGIN
+                DELETE FROM sensor_latest WHERE sensor_id = OLD.id;
+            END
+            """,
+            REBUILD_SENSOR_LATEST_SQL,
+        ],
+    ),
+    (
+        3,
+        [
+            # Per-sensor time-bucket aggregates, maintained on insert.
+            """
+            CREATE TABLE IF NOT EXISTS sensor_rollups (
+                sensor_id INTEGER NOT NULL,
+                resolution TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                min_value REAL,
+                max_value REAL,
+                sum_value REAL,
+                count INTEGER,
+                first_value REAL,
+                first_ts DATETIME,
+                last_value REAL,
+                last_ts DATETIME,
+                PRIMARY KEY (sensor_id, resolution, bucket)
+            ) WITHOUT ROWID
+            """,
+            "CREATE TRIGGER IF NOT EXISTS trg_sensor_data_rollups "
+            "AFTER INSERT ON sensor_data WHEN NEW.value IS NOT NULL BEGIN "
+            + ";".join(
+                _rollup_upsert_sql(
+                    resolution,
+                    "SELECT NEW.sensor_id AS sensor_id, "
+                    "NEW.value AS value, NEW.timestamp AS timestamp",
+                )
+                for resolution in ROLLUP_RESOLUTIONS
+            )
+            + "; END",
+            *(
+                _rollup_upsert_sql(
+                    resolution, "SELECT sensor_id, value, timestamp FROM sensor_data"
+                )
+                for resolution in ROLLUP_RESOLUTIONS
+            ),
+        ],
+    ),
+    (4, [_create_records_fts]),
+    (
+        5,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS table_counts (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            _counter_trigger_sql("parcels", "parcels", "INSERT", "1"),
+            _counter_trigger_sql("parcels", "parcels", "DELETE", "-1"),
+            _counter_trigger_sql("sensors", "sensors", "INSERT", "1"),
+            _counter_trigger_sql("sensors", "sensors", "DELETE", "-1"),
+            _counter_trigger_sql(
+                "unacknowledged_alerts", "alerts", "INSERT", "NEW.acknowledged = 0"
+            ),
+            _counter_trigger_sql(
+                "unacknowledged_alerts", "alerts", "DELETE", "-(OLD.acknowledged = 0)"
+            ),
+            _counter_trigger_sql(
+                "unacknowledged_alerts",
+                "alerts",
+                "UPDATE OF acknowledged",
+                "(NEW.acknowledged = 0) - (OLD.acknowledged = 0)",
+            ),
+            _counter_trigger_sql("maiota_records", "maiota_records", "INSERT", "1"),
+            _counter_trigger_sql("maiota_records", "maiota_records", "DELETE", "-1"),
+            REBUILD_TABLE_COUNTS_SQL,
+        ],
+    ),
+    (
+        6,
+        [
+            # MAIoTA boxes: MQTT topic -> parcel; the topic is the lookup key.
+            """
+            CREATE TABLE IF NOT EXISTS devices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT UNIQUE NOT NULL,
+                parcel_id INTEGER NOT NULL,
+                name TEXT,
+                FOREIGN KEY (parcel_id) REFERENCES parcels (id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_sensors_parcel_type ON sensors (parcel_id, type)",
+        ],
+    ),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
 
 
 class DatabaseManager:
@@ -22,16 +340,86 @@ class DatabaseManager:
         return Path(DB_FILE_NAME).resolve()
 
     @staticmethod
-    def get_connection() -> sqlite3.Connection:
+    def get_pool() -> ConnectionPool:
         """
-        Establishes and returns a connection to the SQLite database.
-        Enables row factory for dictionary-like access.
+        Returns the process-wide connection pool, creating it on first use.
+        The database path is resolved once here instead of on every query,
+        and the schema is created or migrated before the pool is handed out.
+        """
+        global _pool, _checkpointer
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    db_path = str(DatabaseManager.get_db_path())
+                    pool = ConnectionPool(
+                        db_path,
+                        max_size=DB_POOL_SIZE,
+                        timeout=STORAGE_PROFILE.busy_timeout / 1000,
+                        on_connect=[STORAGE_PROFILE.apply],
+                    )
+                    try:
+                        with pool.connection() as conn:
+                            DatabaseManager.create_schema(conn)
+                    except sqlite3.Error as e:
+                        logger.exception(f"Schema migration failed: {e}")
+                    _pool = pool
+                    if (
+                        STORAGE_PROFILE.uses_wal
+                        and STORAGE_PROFILE.checkpoint_interval > 0
+                    ):
+                        _checkpointer = WalCheckpointScheduler(
+                            _pool.connection,
+                            f"{db_path}-wal",
+                            interval=STORAGE_PROFILE.checkpoint_interval,
+                            truncate_bytes=STORAGE_PROFILE.checkpoint_truncate_bytes,
+                        )
+                        _checkpointer.start()
+        return _pool
+
+    @staticmethod
+    def reset_pool():
+        """Closes pooled connections so the next call reopens DB_FILE_NAME."""
+        global _pool, _checkpointer, _fts_enabled
+        _fts_enabled = None
+        sparkline_buffer.discard()
+        with _pool_lock:
+            if _checkpointer is not None:
+                _checkpointer.stop()
+                _checkpointer = None
+            if _pool is not None:
+                _pool.close_all()
+            _pool = None
+
+    @staticmethod
+    def configure_storage(profile: StorageProfile):
+        """Switches the storage profile; pooled connections are reopened."""
+        global STORAGE_PROFILE
+        STORAGE_PROFILE = profile
+        DatabaseManager.reset_pool()
+
+    @staticmethod
+    def checkpoint_wal(mode: str = "PASSIVE") -> Optional[dict]:
+        """Forces a WAL checkpoint. Returns None when WAL is not in use."""
+        DatabaseManager.get_pool()
+        if _checkpointer is None:
+            return None
+        return _checkpointer.checkpoint(mode)
+
+    @staticmethod
+    def get_pool_stats() -> dict:
+        """Returns connection pool hit rate and wait time counters."""
+        return DatabaseManager.get_pool().stats()
+
+    @staticmethod
+    def get_connection() -> PooledConnection:
+        """
+        Checks out a pooled connection to the SQLite database.
+        Use as `with DatabaseManager.get_connection() as conn:`; the block
+        commits on success, rolls back on error and returns the connection.
+        Rows use sqlite3.Row for dictionary-like access.
         """
         try:
-            db_path = DatabaseManager.get_db_path()
-            conn = sqlite3.connect(db_path)
-            conn.row_factory = sqlite3.Row
-            return conn
+            return DatabaseManager.get_pool().connection()
         except sqlite3.Error as e:
             logger.exception(f"Failed to connect to database: {e}")
             raise
@@ -68,6 +456,25 @@ class DatabaseManager:
         """
         Creates the necessary tables for Agrotech system.
         """
+        try:
+            with DatabaseManager.get_connection() as conn:
+                STORAGE_PROFILE.apply(conn)
+                DatabaseManager.create_schema(conn)
+                conn.commit()
+                logger.info("Database schema initialized successfully (Agrotech).")
+                return True
+        except sqlite3.Error as e:
+            logger.exception(f"Database initialization failed: {e}")
+            return False
+
+    @staticmethod
+    def create_schema(conn: sqlite3.Connection) -> int:
+        """
+        Creates any missing base tables and applies pending migrations.
+        Idempotent; runs on the first pooled connection of every process, so
+        existing databases are upgraded before any query touches them.
+        Returns the schema version.
+        """
         create_users_sql = """
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -128,21 +535,45 @@ class DatabaseManager:
             metadata TEXT
         );
         """
-        try:
-            with DatabaseManager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(create_users_sql)
-                cursor.execute(create_parcels_sql)
-                cursor.execute(create_sensors_sql)
-                cursor.execute(create_sensor_data_sql)
-                cursor.execute(create_alerts_sql)
-                cursor.execute(create_maiota_sql)
-                conn.commit()
-                logger.info("Database schema initialized successfully (Agrotech).")
-                return True
-        except sqlite3.Error as e:
-            logger.exception(f"Database initialization failed: {e}")
-            return False
+        cursor = conn.cursor()
+        cursor.execute(create_users_sql)
+        cursor.execute(create_parcels_sql)
+        cursor.execute(create_sensors_sql)
+        cursor.execute(create_sensor_data_sql)
+        cursor.execute(create_alerts_sql)
+        cursor.execute(create_maiota_sql)
+        return DatabaseManager.apply_migrations(conn)
+
+    @staticmethod
+    def get_schema_version(conn: sqlite3.Connection) -> int:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    @staticmethod
+    def apply_migrations(conn: sqlite3.Connection) -> int:
+        """
+        Applies pending SCHEMA_MIGRATIONS in order and records the new
+        version. Returns the resulting schema version. Pending migrations run
+        under one write lock, so processes starting together apply them once.
+        """
+        version = DatabaseManager.get_schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+            version = DatabaseManager.get_schema_version(conn)
+        for target, statements in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            version = target
+            logger.info(f"Applied schema migration v{target}.")
+        conn.execute("PRAGMA optimize")
+        return version
 
     @staticmethod
     def create_user(username: str, password: str, role: str = "user") -> int:
@@ -170,7 +601,8 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (name, location))
             conn.commit()
-            return cursor.lastrowid
+        live_updates.publish(structure_changed=True)
+        return cursor.lastrowid
 
     @staticmethod
     def get_parcels() -> list[dict]:
@@ -196,7 +628,8 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (name, location, parcel_id))
             conn.commit()
-            return cursor.rowcount > 0
+        live_updates.publish(structure_changed=True)
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete_parcel(parcel_id: int) -> bool:
@@ -205,7 +638,9 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (parcel_id,))
             conn.commit()
-            return cursor.rowcount > 0
+        sensor_registry.invalidate()
+        live_updates.publish(structure_changed=True)
+        return cursor.rowcount > 0
 
     @staticmethod
     def create_sensor(
@@ -227,7 +662,9 @@ class DatabaseManager:
                 (parcel_id, type_, unit, description, threshold_low, threshold_high),
             )
             conn.commit()
-            return cursor.lastrowid
+        sensor_registry.invalidate(cursor.lastrowid)
+        live_updates.publish(structure_changed=True)
+        return cursor.lastrowid
 
     @staticmethod
     def get_sensors() -> list[dict]:
@@ -254,6 +691,26 @@ class DatabaseManager:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    @staticmethod
+    def get_sensors_by_ids(sensor_ids: list[int]) -> dict[int, dict]:
+        """
+        Looks up many sensors over a single connection.
+        Returns a dict mapping sensor_id to the sensor row; unknown IDs are absent.
+        """
+        ids = list(dict.fromkeys(sensor_ids))
+        sensors = {}
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(ids), SQL_IN_CHUNK_SIZE):
+                chunk = ids[i : i + SQL_IN_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT * FROM sensors WHERE id IN ({placeholders})", chunk
+                )
+                for row in cursor.fetchall():
+                    sensors[row["id"]] = dict(row)
+        return sensors
+
     @staticmethod
     def update_sensor(
         sensor_id: int,
@@ -275,7 +732,9 @@ class DatabaseManager:
                 (type_, unit, description, threshold_low, threshold_high, sensor_id),
             )
             conn.commit()
-            return cursor.rowcount > 0
+        sensor_registry.invalidate(sensor_id)
+        live_updates.publish(structure_changed=True)
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete_sensor(sensor_id: int) -> bool:
@@ -284,8 +743,116 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (sensor_id,))
             conn.commit()
+        sensor_registry.invalidate(sensor_id)
+        sparkline_buffer.discard(sensor_id)
+        live_updates.publish(structure_changed=True)
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def create_device(topic: str, parcel_id: int, name: str = None) -> int:
+        sql = "INSERT INTO devices (topic, parcel_id, name) VALUES (?, ?, ?)"
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (topic, parcel_id, name))
+            conn.commit()
+            return cursor.lastrowid
+
+    @staticmethod
+    def get_devices() -> list[dict]:
+        sql = "SELECT * FROM devices"
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def delete_device(device_id: int) -> bool:
+        sql = "DELETE FROM devices WHERE id = ?"
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (device_id,))
+            conn.commit()
             return cursor.rowcount > 0
 
+    @staticmethod
+    def get_device_sensor_map(topic: Optional[str] = None) -> dict[str, dict[str, int]]:
+        """
+        Returns {topic: {sensor type: sensor ID}} for registered devices (or
+        only `topic`): the sensors of each device's parcel, first sensor per
+        type. Resolved through the topic and (parcel_id, type) indexes.
+        """
+        sql = """
+        SELECT d.topic, s.type, MIN(s.id) AS sensor_id
+        FROM devices d
+        JOIN sensors s ON s.parcel_id = d.parcel_id
+        """
+        params = []
+        if topic is not None:
+            sql += " WHERE d.topic = ?"
+            params.append(topic)
+        sql += " GROUP BY d.topic, s.type"
+        mapping: dict[str, dict[str, int]] = {}
+        with DatabaseManager.get_connection() as conn:
+            for row in conn.execute(sql, tuple(params)):
+                mapping.setdefault(row["topic"], {})[row["type"]] = row["sensor_id"]
+        return mapping
+
+    @staticmethod
+    def get_retention_partitions(table: str) -> list[tuple]:
+        """
+        Partition keys (e.g. sensor IDs) for batched purges of a
+        RETENTION_TARGETS table; [()] when the table is purged as a whole.
+        """
+        partitions_sql = RETENTION_TARGETS[table][1]
+        if partitions_sql is None:
+            return [()]
+        with DatabaseManager.get_connection() as conn:
+            return [tuple(row) for row in conn.execute(partitions_sql)]
+
+    @staticmethod
+    def purge_expired_batch(
+        table: str,
+        cutoff: str,
+        limit: int,
+        partition: tuple = (),
+        archive: Optional[Callable[[list[dict]], None]] = None,
+    ) -> int:
+        """
+        Deletes up to `limit` rows of a RETENTION_TARGETS table older than
+        `cutoff`, oldest first, in one transaction. `archive(rows)` runs
+        before the delete inside that transaction, so rows are never deleted
+        unless they were archived. Returns the number of rows deleted.
+        """
+        condition = RETENTION_TARGETS[table][0]
+        select_sql = (
+            f"SELECT * FROM {table} WHERE {condition} ORDER BY timestamp LIMIT ?"
+        )
+        delete_sql = f"DELETE FROM {table} WHERE id = ?"
+        with DatabaseManager.get_connection() as conn:
+            rows = conn.execute(select_sql, (*partition, cutoff, limit)).fetchall()
+            if not rows:
+                return 0
+            if archive is not None:
+                archive([dict(row) for row in rows])
+            conn.executemany(delete_sql, [(row["id"],) for row in rows])
+        if table == "maiota_records":
+            DatabaseManager.invalidate_search_counts()
+        return len(rows)
+
+    @staticmethod
+    def get_cached_sensor(sensor_id: int) -> Optional[dict]:
+        """Sensor row from the in-memory registry (read-only, shared)."""
+        return sensor_registry.get(sensor_id)
+
+    @staticmethod
+    def get_cached_sensors(sensor_ids: list[int]) -> dict[int, dict]:
+        """Like get_sensors_by_ids but served from the in-memory registry."""
+        return sensor_registry.get_many(sensor_ids)
+
+    @staticmethod
+    def get_sensor_cache_stats() -> dict:
+        return sensor_registry.stats()
+
     @staticmethod
     def insert_sensor_data(
         sensor_id: int, value: float, raw: str = None, timestamp: str = None
@@ -297,7 +864,38 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (sensor_id, value, raw, timestamp))
             conn.commit()
-            return cursor.lastrowid
+        reading = {"sensor_id": sensor_id, "value": value, "timestamp": timestamp}
+        sparkline_buffer.append([reading])
+        live_updates.publish([reading])
+        return cursor.lastrowid
+
+    @staticmethod
+    def insert_sensor_data_batch(
+        readings: list[dict], alerts: Optional[list[dict]] = None
+    ) -> int:
+        """
+        Inserts readings (sensor_id, value, raw, timestamp) and their alerts
+        (sensor_id, type, message, timestamp) in a single transaction.
+        Returns the number of readings inserted.
+        """
+        data_sql = "INSERT INTO sensor_data (sensor_id, value, raw, timestamp) VALUES (?, ?, ?, ?)"
+        alert_sql = "INSERT INTO alerts (sensor_id, type, message, timestamp) VALUES (?, ?, ?, ?)"
+        data = [
+            (r["sensor_id"], r["value"], r.get("raw"), r["timestamp"]) for r in readings
+        ]
+        alert_rows = [
+            (a["sensor_id"], a["type"], a["message"], a["timestamp"])
+            for a in alerts or []
+        ]
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            if alert_rows:
+                cursor.executemany(alert_sql, alert_rows)
+            cursor.executemany(data_sql, data)
+            conn.commit()
+        sparkline_buffer.append(readings)
+        live_updates.publish(readings, alerts_changed=bool(alert_rows))
+        return len(data)
 
     @staticmethod
     def get_sensor_data(
@@ -316,25 +914,404 @@ class DatabaseManager:
 
     @staticmethod
     def get_latest_readings() -> list[dict]:
-        """Returns the most recent reading for each sensor."""
+        """
+        Returns the most recent reading for each sensor.
+        Served from sensor_latest, so cost is O(number of sensors).
+        """
         sql = """
-        SELECT s.id as sensor_id, s.type, s.parcel_id, sd.value, sd.timestamp, s.unit
+        SELECT s.id as sensor_id, s.type, s.parcel_id, sl.value, sl.timestamp, s.unit
         FROM sensors s
-        LEFT JOIN (
-            SELECT sensor_id, value, timestamp
-            FROM sensor_data
-            WHERE id IN (
-                SELECT MAX(id)
-                FROM sensor_data
-                GROUP BY sensor_id
-            )
-        ) sd ON s.id = sd.sensor_id
+        LEFT JOIN sensor_latest sl ON s.id = sl.sensor_id
         """
         with DatabaseManager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(sql)
             return [dict(row) for row in cursor.fetchall()]
 
+    @staticmethod
+    def rebuild_sensor_latest() -> int:
+        """
+        Repairs sensor_latest from sensor_data (e.g. after manual edits).
+        Returns the number of sensors with a latest reading.
+        """
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sensor_latest")
+            cursor.execute(REBUILD_SENSOR_LATEST_SQL)
+            conn.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def rebuild_rollups() -> int:
+        """
+        Recomputes sensor_rollups from sensor_data (e.g. after a bulk import
+        with triggers disabled). Returns the number of rollup rows.
+        """
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sensor_rollups")
+            for resolution in ROLLUP_RESOLUTIONS:
+                cursor.execute(
+                    _rollup_upsert_sql(
+                        resolution,
+                        "SELECT sensor_id, value, timestamp FROM sensor_data",
+                    )
+                )
+            conn.commit()
+            cursor.execute("SELECT COUNT(*) FROM sensor_rollups")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def get_counts(exact: bool = False) -> dict[str, int]:
+        """
+        Returns the TABLE_COUNTERS counts. By default they are read from
+        table_counts in O(1); `exact` recounts the underlying tables.
+        """
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            if exact:
+                counts = {}
+                for name, sql in TABLE_COUNTERS.items():
+                    cursor.execute(sql)
+                    counts[name] = cursor.fetchone()[0]
+                return counts
+            cursor.execute("SELECT name, value FROM table_counts")
+            counts = dict.fromkeys(TABLE_COUNTERS, 0)
+            counts.update(dict(cursor.fetchall()))
+            return counts
+
+    @staticmethod
+    def rebuild_counts() -> dict[str, int]:
+        """Resets table_counts from exact counts (e.g. after bulk SQL edits)."""
+        with DatabaseManager.get_connection() as conn:
+            conn.execute(REBUILD_TABLE_COUNTS_SQL)
+        return DatabaseManager.get_counts()
+
+    @staticmethod
+    def _raw_history_complete(
+        cursor: sqlite3.Cursor, sensor_id: int, start_date: Optional[str]
+    ) -> bool:
+        """
+        False when raw readings of the window starting at `start_date` were
+        deleted (retention) while their rollups remain: the sensor's oldest
+        1d rollup starts before its oldest raw reading, and the window
+        starts before that reading too.
+        """
+        cursor.execute(
+            """
+            SELECT first_ts FROM sensor_rollups
+            WHERE sensor_id = ? AND resolution = '1d' ORDER BY bucket LIMIT 1
+            """,
+            (sensor_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return True
+        cursor.execute(
+            "SELECT MIN(timestamp) FROM sensor_data WHERE sensor_id = ?", (sensor_id,)
+        )
+        oldest_raw = cursor.fetchone()[0]
+        if oldest_raw is None:
+            return False
+        oldest_raw = oldest_raw.replace(" ", "T")
+        if row[0] >= oldest_raw:
+            return True
+        return start_date is not None and start_date.replace(" ", "T") >= oldest_raw
+
+    @staticmethod
+    def get_sensor_rollup_history(
+        sensor_id: int,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        max_points: int = 500,
+    ) -> dict:
+        """
+        Returns chart-ready history for a sensor within a point budget.
+        Picks the finest resolution (raw, 1m, 1h, 1d) whose number of points
+        in the range fits `max_points`, skipping raw when retention already
+        purged part of the range (its rollups remain); counts are bounded by the budget, so
+        the probe never scans more than max_points + 1 index entries per level.
+        When even 1d is over budget, N consecutive days are merged per point
+        (resolution "Nd") so the points still cover the whole range.
+        Result: {"resolution": str, "points": [{timestamp, value, min, max,
+        count, first, last}]} in ascending time order.
+        """
+        start = start_date.replace(" ", "T") if start_date else None
+        end = end_date.replace(" ", "T") if end_date else None
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            raw_where = "sensor_id = ?"
+            raw_params: list = [sensor_id]
+            if start_date:
+                raw_where += " AND timestamp >= ?"
+                raw_params.append(start_date)
+            if end_date:
+                raw_where += " AND timestamp <= ?"
+                raw_params.append(end_date)
+            cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM sensor_data WHERE {raw_where} LIMIT ?)",
+                (*raw_params, max_points + 1),
+            )
+            fits_budget = cursor.fetchone()[0] <= max_points
+            if fits_budget and DatabaseManager._raw_history_complete(
+                cursor, sensor_id, start_date
+            ):
+                cursor.execute(
+                    f"SELECT timestamp, value FROM sensor_data WHERE {raw_where} ORDER BY timestamp ASC",
+                    raw_params,
+                )
+                points = [
+                    {
+                        "timestamp": row["timestamp"],
+                        "value": row["value"],
+                        "min": row["value"],
+                        "max": row["value"],
+                        "count": 1,
+                        "first": row["value"],
+                        "last": row["value"],
+                    }
+                    for row in cursor.fetchall()
+                ]
+                return {"resolution": "raw", "points": points}
+            for resolution, spec in ROLLUP_RESOLUTIONS.items():
+                where = "sensor_id = ? AND resolution = ?"
+                params: list = [sensor_id, resolution]
+                if start:
+                    where += " AND bucket >= ?"
+                    params.append(start[: spec["prefix"]])
+                if end:
+                    where += " AND bucket <= ?"
+                    params.append(end[: spec["prefix"]])
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM sensor_rollups WHERE {where} LIMIT ?)",
+                    (*params, max_points + 1),
+                )
+                if cursor.fetchone()[0] <= max_points or resolution == "1d":
+                    break
+            cursor.execute(
+                f"""
+                SELECT bucket, min_value, max_value, sum_value, count, first_value, last_value
+                FROM sensor_rollups WHERE {where}
+                ORDER BY bucket ASC
+                """,
+                params,
+            )
+            rows = [tuple(row) for row in cursor.fetchall()]
+            if len(rows) > max_points > 0:
+                # Even 1d is over budget: merge consecutive days so the
+                # points still span the whole range.
+                days = -(-len(rows) // max_points)
+                rows = [
+                    _merge_rollup_rows(rows[i : i + days])
+                    for i in range(0, len(rows), days)
+                ]
+                resolution = f"{days}d"
+            points = [
+                {
+                    "timestamp": bucket + spec["suffix"],
+                    "value": sum_value / count,
+                    "min": min_value,
+                    "max": max_value,
+                    "count": count,
+                    "first": first_value,
+                    "last": last_value,
+                }
+                for bucket, min_value, max_value, sum_value, count, first_value, last_value in rows
+            ]
+            return {"resolution": resolution, "points": points}
+
+    @staticmethod
+    def get_sensor_history_downsampled(
+        sensor_id: int,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        max_points: int = 500,
+        method: str = "lttb",
+    ) -> list[dict]:
+        """
+        Returns at most `max_points` visually representative {timestamp, value}
+        points spanning the whole requested window, in ascending time order.
+
+        - "lttb": Largest-Triangle-Three-Buckets streamed over the cursor
+          (tuples via fetchmany, never a full list of dicts). Windows with more
+          than DOWNSAMPLE_MAX_SOURCE_POINTS readings are reduced from rollups.
+        - "minmax": min and max reading per time bucket, aggregated in SQLite.
+
+        Windows whose raw readings were partly purged by retention are built
+        from rollups (bucket averages for "lttb", bucket min and max for
+        "minmax").
+        """
+        if method not in ("lttb", "minmax"):
+            raise ValueError(f"Unknown downsampling method: {method}")
+        where = "sensor_id = ? AND value IS NOT NULL"
+        params: list = [sensor_id]
+        if start_date:
+            where += " AND timestamp >= ?"
+            params.append(start_date)
+        if end_date:
+            where += " AND timestamp <= ?"
+            params.append(end_date)
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM sensor_data WHERE {where}",
+                params,
+            )
+            total, first_ts, last_ts = cursor.fetchone()
+            complete = DatabaseManager._raw_history_complete(
+                cursor, sensor_id, start_date
+            )
+            if not complete and method == "minmax":
+                history = DatabaseManager.get_sensor_rollup_history(
+                    sensor_id, start_date, end_date, max(1, max_points // 2)
+                )
+                return [
+                    {"timestamp": p["timestamp"], "value": value}
+                    for p in history["points"]
+                    for value in dict.fromkeys((p["min"], p["max"]))
+                ]
+            if complete and total <= max_points:
+                cursor.execute(
+                    f"SELECT timestamp, value FROM sensor_data WHERE {where} ORDER BY timestamp ASC",
+                    params,
+                )
+                return [dict(row) for row in cursor.fetchall()]
+            if method == "minmax":
+                buckets = max(1, max_points // 2)
+                bucket_sql = f"""
+                SELECT MIN(CAST((julianday(timestamp) - julianday(?)) / ? AS INTEGER), ?) AS b,
+                    timestamp, {{agg}}(value)
+                FROM sensor_data WHERE {where} GROUP BY b
+                """
+                cursor.execute(
+                    "SELECT (julianday(?) - julianday(?)) / ?",
+                    (last_ts, first_ts, buckets),
+                )
+                width = cursor.fetchone()[0] or 1.0
+                bucket_params = (first_ts, width, buckets - 1, *params)
+                minima = cursor.execute(
+                    bucket_sql.format(agg="MIN"), bucket_params
+                ).fetchall()
+                maxima = cursor.execute(
+                    bucket_sql.format(agg="MAX"), bucket_params
+                ).fetchall()
+                return merge_min_max(minima, maxima)
+            if not complete or total > DOWNSAMPLE_MAX_SOURCE_POINTS:
+                history = DatabaseManager.get_sensor_rollup_history(
+                    sensor_id, start_date, end_date, DOWNSAMPLE_MAX_SOURCE_POINTS
+                )
+                source = [
+                    (
+                        datetime.fromisoformat(p["timestamp"]).timestamp(),
+                        p["timestamp"],
+                        p["value"],
+                    )
+                    for p in history["points"]
+                ]
+                total = len(source)
+            else:
+                cursor.execute(
+                    f"""
+                    SELECT (julianday(timestamp) - 2440587.5) * 86400.0, timestamp, value
+                    FROM sensor_data WHERE {where} ORDER BY timestamp ASC
+                    """,
+                    params,
+                )
+                source = DatabaseManager._iter_cursor(cursor)
+            return [
+                {"timestamp": timestamp, "value": value}
+                for _, timestamp, value in lttb(source, total, max_points)
+            ]
+
+    @staticmethod
+    def iter_sensor_data(
+        sensor_ids: list[int],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Streams (sensor_id, timestamp, value, raw, id) rows for the given
+        sensors, ordered by sensor then time. Pages of FETCH_BATCH_SIZE rows
+        are read by keyset, each with its own short checkout, so the caller
+        can consume slowly and from any thread. Memory use is independent
+        of the range size.
+        """
+        for sensor_id in sorted(set(sensor_ids)):
+            sql = (
+                "SELECT sensor_id, timestamp, value, raw, id FROM sensor_data "
+                "WHERE sensor_id = ?"
+            )
+            params: list = [sensor_id]
+            if start_date:
+                sql += " AND timestamp >= ?"
+                params.append(start_date)
+            if end_date:
+                sql += " AND timestamp <= ?"
+                params.append(end_date)
+            yield from DatabaseManager._iter_keyset(sql, params)
+
+    @staticmethod
+    def iter_alerts(
+        sensor_ids: Optional[list[int]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Streams alerts in a time window (optionally for some sensors), oldest
+        first, one keyset page per checkout like iter_sensor_data.
+        """
+        sql = "SELECT * FROM alerts WHERE 1=1"
+        params: list = []
+        wanted = None
+        if sensor_ids is not None:
+            ids = list(dict.fromkeys(sensor_ids))
+            if len(ids) <= SQL_IN_CHUNK_SIZE:
+                sql += f" AND sensor_id IN ({','.join('?' * len(ids))})"
+                params.extend(ids)
+            else:
+                # Too many for one IN list; chunking would break time order.
+                wanted = set(ids)
+        if start_date:
+            sql += " AND timestamp >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND timestamp <= ?"
+            params.append(end_date)
+        for row in DatabaseManager._iter_keyset(sql, params):
+            if wanted is None or row["sensor_id"] in wanted:
+                yield row
+
+    @staticmethod
+    def _iter_keyset(
+        sql: str, params: list, size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Yields the rows of `sql` (a SELECT ... WHERE with timestamp and id
+        columns) in (timestamp, id) order, one page per pooled checkout. No
+        connection is held while the caller consumes a page.
+        """
+        after: tuple = ()
+        while True:
+            page_sql = sql
+            if after:
+                page_sql += " AND (timestamp, id) > (?, ?)"
+            page_sql += " ORDER BY timestamp, id LIMIT ?"
+            with DatabaseManager.get_connection() as conn:
+                rows = conn.execute(page_sql, [*params, *after, size]).fetchall()
+            yield from rows
+            if len(rows) < size:
+                return
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+    @staticmethod
+    def _iter_cursor(cursor: sqlite3.Cursor, size: int = FETCH_BATCH_SIZE):
+        """Yields rows from a cursor in fetchmany batches."""
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield from rows
+
     @staticmethod
     def create_alert(
         sensor_id: int, type_: str, message: str, timestamp: str = None
@@ -346,7 +1323,8 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (sensor_id, type_, message, timestamp))
             conn.commit()
-            return cursor.lastrowid
+        live_updates.publish(alerts_changed=True)
+        return cursor.lastrowid
 
     @staticmethod
     def get_alerts(limit: int = 50) -> list[dict]:
@@ -363,7 +1341,8 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute(sql, (alert_id,))
             conn.commit()
-            return cursor.rowcount > 0
+        live_updates.publish(alerts_changed=cursor.rowcount > 0)
+        return cursor.rowcount > 0
 
     @staticmethod
     def get_unacknowledged_alerts() -> list[dict]:
@@ -419,6 +1398,8 @@ class DatabaseManager:
     def check_status() -> dict:
         """
         Checks the health of the database connection and schema.
+        `table_exists` is only set when the schema is at SCHEMA_VERSION, so
+        an unmigrated database is reported as not ready instead of empty.
         """
         status = {
             "connected": False,
@@ -433,10 +1414,15 @@ class DatabaseManager:
                 cursor.execute(
                     "SELECT name FROM sqlite_master WHERE type='table' AND name='maiota_records';"
                 )
-                if cursor.fetchone():
-                    status["table_exists"] = True
-                    cursor.execute("SELECT COUNT(*) FROM maiota_records")
+                if (
+                    cursor.fetchone()
+                    and DatabaseManager.get_schema_version(conn) >= SCHEMA_VERSION
+                ):
+                    cursor.execute(
+                        "SELECT value FROM table_counts WHERE name = 'maiota_records'"
+                    )
                     status["record_count"] = cursor.fetchone()[0]
+                    status["table_exists"] = True
         except Exception as e:
             logger.exception(f"Status check failed: {e}")
         return status
@@ -463,18 +1449,70 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.executemany(sql, data)
             conn.commit()
-            return cursor.rowcount
+        DatabaseManager.invalidate_search_counts()
+        return cursor.rowcount
+
+    @staticmethod
+    def has_records_fts() -> bool:
+        """True when the maiota_records_fts index exists (checked once)."""
+        global _fts_enabled
+        if _fts_enabled is None:
+            with DatabaseManager.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'maiota_records_fts'"
+                ).fetchone()
+            if row is None:
+                return False
+            _fts_enabled = True
+        return _fts_enabled
+
+    @staticmethod
+    def _records_search_clause(search_query: str) -> tuple[str, list]:
+        """WHERE fragment matching records for a search box query."""
+        fts_query = build_fts_query(search_query)
+        if fts_query and DatabaseManager.has_records_fts():
+            return (
+                "id IN (SELECT rowid FROM maiota_records_fts WHERE maiota_records_fts MATCH ?)",
+                [fts_query],
+            )
+        return (
+            "(source_key LIKE ? OR category LIKE ?)",
+            [f"%{search_query}%", f"%{search_query}%"],
+        )
+
+    @staticmethod
+    def search_records(search_query: str, limit: int = 50) -> list[dict]:
+        """
+        Ranked (BM25) prefix search over source_key, category, value_str and
+        metadata. Falls back to unranked LIKE search without FTS5.
+        """
+        fts_query = build_fts_query(search_query)
+        if not fts_query or not DatabaseManager.has_records_fts():
+            return DatabaseManager.fetch_records(limit, 0, search_query)
+        sql = """
+        SELECT r.*, bm25(maiota_records_fts) AS rank
+        FROM maiota_records_fts
+        JOIN maiota_records r ON r.id = maiota_records_fts.rowid
+        WHERE maiota_records_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """
+        with DatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (fts_query, limit))
+            return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
     def fetch_records(limit: int, offset: int, search_query: str = "") -> list[dict]:
         if search_query:
-            sql = """
+            clause, search_params = DatabaseManager._records_search_clause(search_query)
+            sql = f"""
             SELECT * FROM maiota_records 
-            WHERE source_key LIKE ? OR category LIKE ?
+            WHERE {clause}
             ORDER BY timestamp DESC 
             LIMIT ? OFFSET ?
             """
-            params = (f"%{search_query}%", f"%{search_query}%", limit, offset)
+            params = (*search_params, limit, offset)
         else:
             sql = (
                 "SELECT * FROM maiota_records ORDER BY timestamp DESC LIMIT ? OFFSET ?"
@@ -486,17 +1524,124 @@ class DatabaseManager:
             return [dict(row) for row in cursor.fetchall()]
 
     @staticmethod
-    def count_records(search_query: str = "") -> int:
+    def encode_cursor(timestamp: str, row_id: int) -> str:
+        """Opaque keyset cursor for the (timestamp, id) position of a row."""
+        raw = json.dumps([timestamp, row_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[str, int]:
+        """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+        try:
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return str(timestamp), int(row_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+    @staticmethod
+    def _keyset_page(cursor: sqlite3.Cursor, limit: int) -> dict:
+        rows = [dict(row) for row in cursor.fetchmany(limit + 1)]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = DatabaseManager.encode_cursor(last["timestamp"], last["id"])
+        return {"items": rows, "next_cursor": next_cursor}
+
+    @staticmethod
+    def fetch_records_page(
+        limit: int, cursor: Optional[str] = None, search_query: str = ""
+    ) -> dict:
+        """
+        Keyset-paginated maiota_records, newest first, ordered by
+        (timestamp, id). Page N costs the same as page 1.
+        Returns {"items": [...], "next_cursor": str | None}.
+        """
+        sql = "SELECT * FROM maiota_records WHERE 1=1"
+        params: list = []
+        if search_query:
+            clause, search_params = DatabaseManager._records_search_clause(search_query)
+            sql += f" AND {clause}"
+            params += search_params
+        if cursor:
+            sql += " AND (timestamp, id) < (?, ?)"
+            params += DatabaseManager.decode_cursor(cursor)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with DatabaseManager.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return DatabaseManager._keyset_page(cur, limit)
+
+    @staticmethod
+    def get_sensor_data_page(
+        sensor_id: int,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> dict:
+        """
+        Keyset-paginated sensor history, newest first, ordered by
+        (timestamp, id). Returns {"items": [...], "next_cursor": str | None}.
+        """
+        sql = "SELECT * FROM sensor_data WHERE sensor_id = ?"
+        params: list = [sensor_id]
+        if start_date:
+            sql += " AND timestamp >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND timestamp <= ?"
+            params.append(end_date)
+        if cursor:
+            sql += " AND (timestamp, id) < (?, ?)"
+            params += DatabaseManager.decode_cursor(cursor)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with DatabaseManager.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return DatabaseManager._keyset_page(cur, limit)
+
+    @staticmethod
+    def count_records(search_query: str = "", exact: bool = False) -> int:
+        """
+        Counts records, optionally matching a search query. The unfiltered
+        count comes from table_counts; search counts are cached until the
+        next insert and capped at SEARCH_COUNT_CAP so a broad prefix never
+        counts millions of matches. `exact` bypasses both.
+        """
         if search_query:
-            sql = "SELECT COUNT(*) FROM maiota_records WHERE source_key LIKE ? OR category LIKE ?"
-            params = (f"%{search_query}%", f"%{search_query}%")
+            clause, params = DatabaseManager._records_search_clause(search_query)
+            if exact:
+                sql = f"SELECT COUNT(*) FROM maiota_records WHERE {clause}"
+            else:
+                with _search_count_lock:
+                    if search_query in _search_count_cache:
+                        _search_count_cache.move_to_end(search_query)
+                        return _search_count_cache[search_query]
+                sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM maiota_records WHERE {clause} LIMIT ?)"
+                params = [*params, SEARCH_COUNT_CAP]
+        elif exact:
+            sql = TABLE_COUNTERS["maiota_records"]
+            params = []
         else:
-            sql = "SELECT COUNT(*) FROM maiota_records"
-            params = ()
+            return DatabaseManager.get_counts()["maiota_records"]
         with DatabaseManager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(sql, params)
-            return cursor.fetchone()[0]
+            count = cursor.fetchone()[0]
+        if search_query and not exact:
+            with _search_count_lock:
+                _search_count_cache[search_query] = count
+                while len(_search_count_cache) > SEARCH_COUNT_CACHE_SIZE:
+                    _search_count_cache.popitem(last=False)
+        return count
+
+    @staticmethod
+    def invalidate_search_counts():
+        with _search_count_lock:
+            _search_count_cache.clear()
 
     @staticmethod
     def get_sensor_data_history(
@@ -523,21 +1668,46 @@ class DatabaseManager:
             cursor.execute(sql, tuple(params))
             return [dict(row) for row in cursor.fetchall()]
 
+    @staticmethod
+    def get_sparklines(reconcile: bool = False) -> tuple[int, dict[int, list[dict]]]:
+        """
+        Sparkline history for all sensors from the in-memory ring buffer.
+        `reconcile` first merges in readings from the database, including
+        ones written by other processes.
+        Returns (seq, {sensor_id: [{value, timestamp}, ...]}).
+        """
+        return sparkline_buffer.history(reconcile)
+
+    @staticmethod
+    def get_sparkline_delta(seq: int) -> dict:
+        """
+        Sparkline points added after sequence number `seq`:
+        {"seq": current, "points": {sensor_id: [[seq, timestamp, value], ...]}}.
+        """
+        current, points = sparkline_buffer.since(seq)
+        return {"seq": current, "points": points}
+
+    @staticmethod
+    def get_sparkline_stats() -> dict:
+        return sparkline_buffer.stats()
+
     @staticmethod
     def get_sensor_history_batch(limit: int = 20) -> dict[int, list[dict]]:
         """
         Retrieves recent history for all sensors to display sparklines.
         Returns a dict mapping sensor_id to a list of data points.
+        Reads at most `limit` index entries per sensor, never the whole table.
         """
         sql = """
-        SELECT sensor_id, value, timestamp 
-        FROM (
-            SELECT sensor_id, value, timestamp,
-            ROW_NUMBER() OVER (PARTITION BY sensor_id ORDER BY timestamp DESC) as rn
-            FROM sensor_data
-        ) 
-        WHERE rn <= ?
-        ORDER BY timestamp ASC
+        SELECT d.sensor_id, d.value, d.timestamp
+        FROM sensors s
+        JOIN sensor_data d ON d.id IN (
+            SELECT id FROM sensor_data
+            WHERE sensor_id = s.id
+            ORDER BY timestamp DESC
+            LIMIT ?
+        )
+        ORDER BY d.timestamp ASC
         """
         history_map = {}
         try:
@@ -558,24 +1728,19 @@ class DatabaseManager:
             return {}
 
     @staticmethod
-    def get_system_stats() -> dict:
+    def get_system_stats(exact: bool = False) -> dict:
         """
         Returns aggregated system statistics for the dashboard API.
+        Counts come from table_counts unless `exact` is set. Errors (e.g. a
+        schema that was never migrated) are raised, not reported as zeros.
         """
-        try:
-            with DatabaseManager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM parcels")
-                parcels_count = cursor.fetchone()[0]
-                cursor.execute("SELECT COUNT(*) FROM sensors")
-                sensors_count = cursor.fetchone()[0]
-                cursor.execute("SELECT COUNT(*) FROM alerts WHERE acknowledged = 0")
-                alerts_count = cursor.fetchone()[0]
-                return {
-                    "parcels_count": parcels_count,
-                    "sensors_count": sensors_count,
-                    "active_alerts_count": alerts_count,
-                }
-        except Exception as e:
-            logger.exception(f"Failed to get system stats: {e}")
-            return {"parcels_count": 0, "sensors_count": 0, "active_alerts_count": 0}
\ No newline at end of file
+        counts = DatabaseManager.get_counts(exact)
+        return {
+            "parcels_count": counts["parcels"],
+            "sensors_count": counts["sensors"],
+            "active_alerts_count": counts["unacknowledged_alerts"],
+        }
+
+
+sensor_registry = SensorRegistry(loader=DatabaseManager.get_sensors_by_ids)
+sparkline_buffer = SparklineBuffer(loader=DatabaseManager.get_sensor_history_batch)
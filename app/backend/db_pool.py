@@ -0,0 +1,240 @@
+import sqlite3
+import threading
+import time
+import logging
+from collections.abc import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that knows about nested checkouts. While a nested
+    block holds a savepoint, commit() is left to the outermost block and
+    rollback() only undoes the nested block's work.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.savepoints: list[str] = []
+
+    def commit(self):
+        if not self.savepoints:
+            super().commit()
+
+    def rollback(self):
+        if self.savepoints:
+            self.execute(f"ROLLBACK TO {self.savepoints[-1]}")
+        else:
+            super().rollback()
+
+
+class PooledConnection:
+    """
+    Context manager returned by ConnectionPool.connection().
+    Behaves like `with sqlite3.connect(...) as conn:` (commit on success,
+    rollback on error) and hands the connection back to the pool on exit.
+    Only the outermost block ends the transaction; a nested block on the
+    same thread runs inside a SAVEPOINT that it releases, or rolls back to
+    on error.
+    """
+
+    def __init__(self, pool: "ConnectionPool"):
+        self._pool = pool
+        self._conn: Optional[_PoolConnection] = None
+        self._owner: Optional[int] = None
+        self._savepoint: Optional[str] = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn, self._owner = self._pool._acquire()
+        if self._owner is None:
+            try:
+                self._savepoint = f"pool_sp_{len(self._conn.savepoints)}"
+                self._conn.execute(f"SAVEPOINT {self._savepoint}")
+                self._conn.savepoints.append(self._savepoint)
+            except BaseException:
+                self._pool._release(self._conn, None)
+                self._savepoint = None
+                raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        conn = self._conn
+        try:
+            if self._savepoint is not None:
+                conn.savepoints.pop()
+                if exc_type is not None:
+                    conn.execute(f"ROLLBACK TO {self._savepoint}")
+                conn.execute(f"RELEASE {self._savepoint}")
+            elif exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            self._pool._release(conn, self._owner, broken=exc_type is not None)
+            self._conn = None
+            self._savepoint = None
+        return False
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections.
+
+    - Connections are opened once (path resolved once) and reused.
+    - `on_connect` hooks (PRAGMAs) run once per physical connection.
+    - A thread that already holds a connection gets the same one back when
+      it nests `with` blocks, so re-entrant calls never deadlock the pool;
+      the nested block runs in a savepoint of the outer transaction.
+    - Idle connections are health-checked with `SELECT 1` before reuse.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        on_connect: Optional[list[Callable[[sqlite3.Connection], None]]] = None,
+    ):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = list(on_connect or [])
+        self._idle: list[tuple[sqlite3.Connection, float]] = []
+        self._all: set[sqlite3.Connection] = set()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._held: dict[int, list] = {}
+        self._stats = {
+            "checkouts": 0,
+            "hits": 0,
+            "misses": 0,
+            "reentrant": 0,
+            "health_check_failures": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def connection(self) -> PooledConnection:
+        return PooledConnection(self)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            factory=_PoolConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for hook in self.on_connect:
+            hook(conn)
+        with self._lock:
+            self._all.add(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._all.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def _acquire(self) -> tuple[sqlite3.Connection, Optional[int]]:
+        """
+        Returns (connection, owner). `owner` is the thread id that checked the
+        connection out, or None for a nested checkout on the same thread.
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            held = self._held.get(thread_id)
+            if held is not None:
+                held[1] += 1
+                self._stats["reentrant"] += 1
+                return held[0], None
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a pooled connection"
+            )
+        waited = time.perf_counter() - started
+        conn = None
+        try:
+            while conn is None:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn = self._open()
+                    hit = False
+                    break
+                candidate, idle_since = entry
+                if (
+                    time.monotonic() - idle_since < self.health_check_interval
+                    or self._is_healthy(candidate)
+                ):
+                    conn = candidate
+                    hit = True
+                else:
+                    with self._lock:
+                        self._stats["health_check_failures"] += 1
+                    self._discard(candidate)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            self._held[thread_id] = [conn, 1]
+        return conn, thread_id
+
+    def _release(
+        self, conn: sqlite3.Connection, owner: Optional[int], broken: bool = False
+    ):
+        if owner is None:
+            with self._lock:
+                held = self._held.get(threading.get_ident())
+                if held is not None:
+                    held[1] -= 1
+            return
+        with self._lock:
+            self._held.pop(owner, None)
+        try:
+            if broken and not self._is_healthy(conn):
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Returns pool counters: hit rate, wait time and connection counts."""
+        with self._lock:
+            s = dict(self._stats)
+            s["open_connections"] = len(self._all)
+            s["idle_connections"] = len(self._idle)
+        checkouts = s["checkouts"]
+        s["max_size"] = self.max_size
+        s["hit_rate"] = s["hits"] / checkouts if checkouts else 0.0
+        s["wait_time_avg"] = s["wait_time_total"] / checkouts if checkouts else 0.0
+        return s
+
+    def close_all(self):
+        """Closes every idle connection (e.g. on shutdown or path change)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+DEVICE_REFRESH_INTERVAL = 60.0
+DEVICE_MISS_INTERVAL = 5.0
+
+
+class DeviceRegistry:
+    """
+    MQTT topic -> {sensor type: sensor ID} for every MAIoTA device.
+
+    The whole map is loaded with `loader()` and swapped in atomically, so
+    lookups from the MQTT workers are a lock-free dict read. It is reloaded
+    by the first lookup after `refresh_interval` seconds. A topic that is
+    not in the map is looked up on its own with `topic_loader(topic)` (an
+    indexed query) at most once per `miss_interval` seconds, so a newly
+    registered device starts reporting without waiting for the next full
+    refresh and an unknown one cannot flood the database.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], dict[str, dict[str, int]]],
+        topic_loader: Optional[Callable[[str], dict[str, dict[str, int]]]] = None,
+        refresh_interval: float = DEVICE_REFRESH_INTERVAL,
+        miss_interval: float = DEVICE_MISS_INTERVAL,
+    ):
+        self.loader = loader
+        self.topic_loader = topic_loader
+        self.refresh_interval = refresh_interval
+        self.miss_interval = miss_interval
+        self._lock = threading.Lock()
+        self._devices: dict[str, dict[str, int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._misses: dict[str, float] = {}
+        self._stats = {"refreshes": 0, "hits": 0, "unknown": 0}
+
+    def refresh(self):
+        """Reloads the whole map (single-flight; errors keep the old map)."""
+        with self._lock:
+            try:
+                devices = self.loader()
+            except Exception as e:
+                logger.exception(f"Device map refresh failed: {e}")
+                devices = self._devices
+            self._devices = devices
+            self._loaded_at = time.monotonic()
+            self._misses.clear()
+            self._stats["refreshes"] += 1
+        logger.info(f"Device map: {len(devices)} devices.")
+
+    def _stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.refresh_interval
+        )
+
+    def lookup(self, topic: str) -> Optional[dict[str, int]]:
+        """Returns {sensor type: sensor ID} for a topic, or None if unknown."""
+        if self._stale() and not self._lock.locked():
+            self.refresh()
+        sensors = self._devices.get(topic)
+        if sensors is not None:
+            self._stats["hits"] += 1
+            return sensors
+        self._stats["unknown"] += 1
+        if self.topic_loader is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if now - self._misses.get(topic, -self.miss_interval) < self.miss_interval:
+                return None
+            self._misses[topic] = now
+        try:
+            found = self.topic_loader(topic)
+        except Exception as e:
+            logger.exception(f"Device lookup for {topic!r} failed: {e}")
+            return None
+        if topic in found:
+            logger.info(f"New device on topic {topic!r}.")
+            self._devices = {**self._devices, **found}
+        return found.get(topic)
+
+    def stats(self) -> dict:
+        return {**self._stats, "devices": len(self._devices)}
@@ -0,0 +1,85 @@
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+# A point is (x, timestamp, value) where x is a numeric time (epoch seconds).
+Point = tuple[float, str, float]
+
+
+def lttb(points: Iterable[Point], total: int, threshold: int) -> Iterator[Point]:
+    """
+    Largest-Triangle-Three-Buckets over a time-ordered stream of `total`
+    points, yielding at most `threshold` of them.
+
+    Only the current and next bucket are held in memory, so the input can
+    be a cursor over millions of rows. Always keeps the first and last point.
+    `total` may be stale (rows deleted or inserted after it was counted):
+    a stream that ends early is closed at its last point, and rows past
+    `total` only move the last point.
+    """
+    it = iter(points)
+    if threshold >= total or threshold < 3:
+        yield from it
+        return
+    buckets = threshold - 2
+
+    def bucket_end(i: int) -> int:
+        # Exclusive end index of bucket i; buckets cover indices 1..total-2.
+        return (i + 1) * (total - 2) // buckets + 1
+
+    def pick(bucket: list[Point], selected: Point, avg_x: float, avg_y: float):
+        ax, ay = selected[0], selected[2]
+        return max(
+            bucket,
+            key=lambda p: abs((ax - avg_x) * (p[2] - ay) - (ax - p[0]) * (avg_y - ay)),
+        )
+
+    first = next(it, None)
+    if first is None:
+        return
+    yield first
+    selected = first
+    index = bucket_end(0)
+    current = list(islice(it, index - 1))
+    for i in range(buckets):
+        following = []
+        if i < buckets - 1:
+            end = bucket_end(i + 1)
+            following = list(islice(it, end - index))
+            index = end
+        if not following:
+            # Last bucket, or the stream ran out early.
+            last = None
+            for last in it:
+                pass
+            if last is None:
+                if not current:
+                    return
+                last = current.pop()
+            if current:
+                yield pick(current, selected, last[0], last[2])
+            yield last
+            return
+        avg_x = sum(p[0] for p in following) / len(following)
+        avg_y = sum(p[2] for p in following) / len(following)
+        selected = pick(current, selected, avg_x, avg_y)
+        yield selected
+        current = following
+
+
+def merge_min_max(
+    minima: Iterable[tuple[int, str, float]], maxima: Iterable[tuple[int, str, float]]
+) -> list[dict]:
+    """
+    Merges per-bucket (bucket, timestamp, value) minima and maxima into one
+    time-ordered series, emitting both extremes of each bucket once.
+    """
+    by_bucket: dict[int, dict[str, float]] = {}
+    for bucket, timestamp, value in minima:
+        by_bucket.setdefault(bucket, {})[timestamp] = value
+    for bucket, timestamp, value in maxima:
+        by_bucket.setdefault(bucket, {})[timestamp] = value
+    series = []
+    for bucket in sorted(by_bucket):
+        for timestamp, value in sorted(by_bucket[bucket].items()):
+            series.append({"timestamp": timestamp, "value": value})
+    return series
@@ -0,0 +1,342 @@
+"""
+Export of historical readings: columnar (Parquet / Arrow, with alerts) and
+row streams (NDJSON / CSV) for the history API.
+
+    python -m app.backend.export --start 2024-01-01 --end 2024-03-31 --out exports/
+    python -m app.backend.export --start 2024-01-01 --sensor 3 --sensor 4 --alerts
+
+Writes a Hive-partitioned Parquet dataset:
+
+    <out>/sensor_data/date=YYYY-MM-DD/parcel_id=N/part-0.parquet
+    <out>/alerts/date=YYYY-MM-DD/parcel_id=N/part-0.parquet
+
+pyarrow is optional: it is only needed to export.
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+from app.backend.database import DatabaseManager, FETCH_BATCH_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+EXPORT_COMPRESSION = "zstd"
+EXPORT_BATCH_ROWS = FETCH_BATCH_SIZE * 10
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow).")
+
+
+def sensor_data_schema() -> "pa.Schema":
+    return pa.schema(
+        [
+            ("sensor_id", pa.int64()),
+            ("parcel_id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("value", pa.float64()),
+            ("raw", pa.string()),
+        ]
+    )
+
+
+def alerts_schema() -> "pa.Schema":
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("sensor_id", pa.int64()),
+            ("parcel_id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("type", pa.string()),
+            ("message", pa.string()),
+            ("acknowledged", pa.bool_()),
+        ]
+    )
+
+
+def _timestamps(values: list) -> "pa.Array":
+    strings = pa.array(values, pa.string())
+    try:
+        return pc.cast(strings, pa.timestamp("us"))
+    except pa.ArrowInvalid:
+        # A malformed timestamp somewhere in the batch: parse one by one.
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(datetime.fromisoformat(value))
+            except (TypeError, ValueError):
+                parsed.append(None)
+        return pa.array(parsed, pa.timestamp("us"))
+
+
+def _record_batches(
+    rows: Iterable, schema: "pa.Schema", parcel_of: dict[int, int]
+) -> Iterator["pa.RecordBatch"]:
+    """Groups rows (with a sensor_id column) into record batches of the schema."""
+    names = [name for name in schema.names if name != "parcel_id"]
+    rows = iter(rows)
+    while True:
+        buffer = [
+            tuple(row[name] for name in names)
+            for row in islice(rows, EXPORT_BATCH_ROWS)
+        ]
+        if not buffer:
+            return
+        columns = dict(zip(names, zip(*buffer)))
+        arrays = []
+        for field in schema:
+            if field.name == "parcel_id":
+                values = [parcel_of.get(s) for s in columns["sensor_id"]]
+            else:
+                values = list(columns[field.name])
+            if field.name == "timestamp":
+                arrays.append(_timestamps(values))
+            elif pa.types.is_boolean(field.type):
+                # SQLite stores booleans as 0/1.
+                values = [None if v is None else bool(v) for v in values]
+                arrays.append(pa.array(values, field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _select_sensors(sensor_ids: Optional[list[int]]) -> list[dict]:
+    sensors = DatabaseManager.get_sensors()
+    if sensor_ids:
+        wanted = set(sensor_ids)
+        sensors = [s for s in sensors if s["id"] in wanted]
+    return sensors
+
+
+def sensor_data_batches(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sensor_ids: Optional[list[int]] = None,
+) -> Iterator["pa.RecordBatch"]:
+    """Streams sensor_data for a window and sensor set as Arrow record batches."""
+    require_pyarrow()
+    sensors = _select_sensors(sensor_ids)
+    parcel_of = {s["id"]: s["parcel_id"] for s in sensors}
+    rows = DatabaseManager.iter_sensor_data(list(parcel_of), start_date, end_date)
+    yield from _record_batches(rows, sensor_data_schema(), parcel_of)
+
+
+def _days(start: date, end: date) -> Iterator[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _write_partition(path: Path, schema: "pa.Schema", batches) -> int:
+    """
+    Writes batches to one Parquet file (created only if there are rows),
+    without parcel_id: the partition directory already encodes it.
+    """
+    keep = [i for i, name in enumerate(schema.names) if name != "parcel_id"]
+    file_schema = pa.schema([schema.field(i) for i in keep])
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(
+                    path, file_schema, compression=EXPORT_COMPRESSION
+                )
+            writer.write_batch(
+                pa.RecordBatch.from_arrays(
+                    [batch.column(i) for i in keep], schema=file_schema
+                )
+            )
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_dataset(
+    out_dir: str,
+    start_date: str,
+    end_date: Optional[str] = None,
+    sensor_ids: Optional[list[int]] = None,
+    include_alerts: bool = False,
+) -> dict:
+    """
+    Exports a window (whole days from start_date to end_date, inclusive) to
+    a Parquet dataset partitioned by date and parcel. Each partition is read
+    with its own index-range query and written before the next one starts,
+    so only one file and one record batch are open at a time.
+    Returns {"sensor_data": rows, "alerts": rows, "files": [paths]}.
+    """
+    require_pyarrow()
+    first = date.fromisoformat(start_date[:10])
+    last = date.fromisoformat((end_date or datetime.now().isoformat())[:10])
+    by_parcel: dict[int, list[int]] = {}
+    for s in _select_sensors(sensor_ids):
+        by_parcel.setdefault(s["parcel_id"], []).append(s["id"])
+    parcel_of = {sid: pid for pid, sids in by_parcel.items() for sid in sids}
+    root = Path(out_dir)
+    result = {"sensor_data": 0, "alerts": 0, "files": []}
+    for day in _days(first, last):
+        # Date-only upper bound: "YYYY-MM-DD" sorts before any timestamp of that day.
+        day_start, day_end = day.isoformat(), (day + timedelta(days=1)).isoformat()
+        for parcel_id, ids in sorted(by_parcel.items()):
+            partition = f"date={day_start}/parcel_id={parcel_id}/part-0.parquet"
+            path = root / "sensor_data" / partition
+            rows = DatabaseManager.iter_sensor_data(ids, day_start, day_end)
+            count = _write_partition(
+                path,
+                sensor_data_schema(),
+                _record_batches(rows, sensor_data_schema(), parcel_of),
+            )
+            if count:
+                result["sensor_data"] += count
+                result["files"].append(str(path))
+            if include_alerts:
+                path = root / "alerts" / partition
+                rows = DatabaseManager.iter_alerts(ids, day_start, day_end)
+                count = _write_partition(
+                    path,
+                    alerts_schema(),
+                    _record_batches(rows, alerts_schema(), parcel_of),
+                )
+                if count:
+                    result["alerts"] += count
+                    result["files"].append(str(path))
+    return result
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes to a generator."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.closed = False
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_sensor_data(
+    fmt: str = "parquet",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sensor_ids: Optional[list[int]] = None,
+) -> Iterator[bytes]:
+    """
+    Yields a single Parquet file (one row group per batch) or an Arrow IPC
+    stream ("arrow") with sensor_data for a window, batch by batch, for
+    HTTP streaming with bounded memory.
+    """
+    require_pyarrow()
+    schema = sensor_data_schema()
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pq.ParquetWriter(
+            pa.PythonFile(sink, mode="w"), schema, compression=EXPORT_COMPRESSION
+        )
+    try:
+        for batch in sensor_data_batches(start_date, end_date, sensor_ids):
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+HISTORY_COLUMNS = ("sensor_id", "timestamp", "value", "raw")
+
+
+def encode_ndjson(rows: Iterable) -> Iterator[str]:
+    """Encodes sensor_data rows as NDJSON, one chunk per fetch batch."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, FETCH_BATCH_SIZE))
+        if not batch:
+            return
+        yield "".join(
+            json.dumps({name: row[name] for name in HISTORY_COLUMNS}) + "\n"
+            for row in batch
+        )
+
+
+def encode_csv(rows: Iterable) -> Iterator[str]:
+    """Encodes sensor_data rows as CSV with a header, one chunk per fetch batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HISTORY_COLUMNS)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, FETCH_BATCH_SIZE))
+        writer.writerows(tuple(row[name] for name in HISTORY_COLUMNS) for row in batch)
+        chunk = buffer.getvalue()
+        if chunk:
+            yield chunk
+        if not batch:
+            return
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.backend.export",
+        description="Export sensor history to a partitioned Parquet dataset.",
+    )
+    parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last day, inclusive (default: today)")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    parser.add_argument(
+        "--sensor", type=int, action="append", help="Sensor ID (repeatable)"
+    )
+    parser.add_argument("--alerts", action="store_true", help="Also export alerts")
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = build_parser().parse_args(argv)
+    result = export_dataset(args.out, args.start, args.end, args.sensor, args.alerts)
+    logger.info(
+        f"Exported {result['sensor_data']} readings and {result['alerts']} alerts "
+        f"to {len(result['files'])} files under {args.out}."
+    )
+
+
+if __name__ == "__main__":
+    main()
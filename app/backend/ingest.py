@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime
+from typing import Optional
+from app.backend.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_threshold(sensor: dict, value: float) -> Optional[tuple[str, str]]:
+    """
+    Compares a value with the sensor thresholds.
+    Returns (alert_type, message) when a threshold is violated, else None.
+    """
+    high = sensor["threshold_high"]
+    low = sensor["threshold_low"]
+    if high is not None and value > high:
+        return ("THRESHOLD_HIGH", f"Value {value} exceeded high threshold {high}")
+    if low is not None and value < low:
+        return ("THRESHOLD_LOW", f"Value {value} dropped below low threshold {low}")
+    return None
+
+
+def prepare_readings(
+    rows: list[dict], sensors: dict[int, dict]
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Validates rows against known sensors and evaluates thresholds in memory.
+    Returns (readings, alerts, results) where `results` holds one status
+    entry per input row, in input order.
+    """
+    readings = []
+    alerts = []
+    results = []
+    now = datetime.now().isoformat()
+    for index, row in enumerate(rows):
+        sensor_id = row["sensor_id"]
+        sensor = sensors.get(sensor_id)
+        if sensor is None:
+            results.append(
+                {
+                    "index": index,
+                    "sensor_id": sensor_id,
+                    "status": "error",
+                    "message": f"Sensor with ID {sensor_id} not found.",
+                }
+            )
+            continue
+        value = row["value"]
+        timestamp = row.get("timestamp") or now
+        readings.append(
+            {
+                "sensor_id": sensor_id,
+                "value": value,
+                "raw": row.get("raw"),
+                "timestamp": timestamp,
+            }
+        )
+        alert = evaluate_threshold(sensor, value)
+        if alert:
+            alerts.append(
+                {
+                    "sensor_id": sensor_id,
+                    "type": alert[0],
+                    "message": alert[1],
+                    "timestamp": timestamp,
+                }
+            )
+        results.append(
+            {
+                "index": index,
+                "sensor_id": sensor_id,
+                "status": "success",
+                "message": (
+                    f"Data ingested; {alert[0]} alert created."
+                    if alert
+                    else "Data ingested."
+                ),
+            }
+        )
+    return readings, alerts, results
+
+
+def ingest_readings(rows: list[dict]) -> dict:
+    """
+    Ingests a batch of {sensor_id, value, timestamp, raw} rows:
+    sensors resolved from the registry cache, in-memory threshold checks
+    and a single write transaction for all readings and alerts.
+    """
+    sensors = DatabaseManager.get_cached_sensors([r["sensor_id"] for r in rows])
+    readings, alerts, results = prepare_readings(rows, sensors)
+    if readings:
+        DatabaseManager.insert_sensor_data_batch(readings, alerts)
+    return {
+        "accepted": len(readings),
+        "rejected": len(rows) - len(readings),
+        "alerts_created": len(alerts),
+        "results": results,
+    }
@@ -0,0 +1,295 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional
+from app.backend.async_db import async_db
+from app.backend.database import DatabaseManager
+from app.backend.ingest import prepare_readings
+
+logger = logging.getLogger(__name__)
+INGEST_QUEUE_MAX_PENDING = 20000
+INGEST_BATCH_SIZE = 1000
+INGEST_FLUSH_INTERVAL_MS = 50
+INGEST_BLOCK_TIMEOUT = 0.0
+INGEST_MAX_RETRIES = 3
+INGEST_RETRY_BACKOFF = 0.5
+INGEST_SPOOL_PATH = "spool/ingest.ndjson"
+
+
+class IngestQueueFull(Exception):
+    """Raised when the write-behind queue cannot accept more readings."""
+
+
+class IngestQueueStopped(Exception):
+    """Raised when readings arrive after the write-behind queue was stopped."""
+
+
+class IngestQueue:
+    """
+    Write-behind buffer between the async ingest endpoints and SQLite.
+
+    Endpoints validate readings and enqueue them as frames; a single writer
+    task drains frames and writes them in group commits, flushing when
+    `batch_size` readings are pending or `flush_interval` seconds have passed
+    since the first pending frame. The blocking commit runs on the database
+    executor (async_db) so a slow fsync never stalls the event loop.
+
+    Backpressure: when `max_pending` readings are already queued, `submit`
+    waits up to `block_timeout` seconds for space (0 rejects immediately)
+    and then raises IngestQueueFull. After `stop` it raises
+    IngestQueueStopped until the queue is started again.
+
+    Readings reported as "queued" are not dropped on a failed commit: the
+    batch is retried `max_retries` times with exponential backoff, then
+    appended to the `spool_path` NDJSON file, which is written back to the
+    database when the writer starts and after the next successful flush.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[list[dict], list[dict]], int],
+        max_pending: int = INGEST_QUEUE_MAX_PENDING,
+        batch_size: int = INGEST_BATCH_SIZE,
+        flush_interval: float = INGEST_FLUSH_INTERVAL_MS / 1000,
+        block_timeout: float = INGEST_BLOCK_TIMEOUT,
+        max_retries: int = INGEST_MAX_RETRIES,
+        retry_backoff: float = INGEST_RETRY_BACKOFF,
+        spool_path: str = INGEST_SPOOL_PATH,
+    ):
+        self.writer = writer
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.spool = Path(spool_path)
+        self._frames: deque[tuple[list[dict], list[dict]]] = deque()
+        self._pending = 0
+        self._has_data = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._closing = False
+        self._stopped = False
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "flushes": 0,
+            "flushed_readings": 0,
+            "write_errors": 0,
+            "retries": 0,
+            "spooled_readings": 0,
+            "replayed_readings": 0,
+            "max_depth": 0,
+            "flush_latency_ms_last": 0.0,
+            "flush_latency_ms_max": 0.0,
+            "flush_latency_ms_total": 0.0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return self._pending
+
+    def start(self):
+        """Starts the writer task on the running loop (idempotent)."""
+        self._stopped = False
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Rejects new readings, flushes (or spools) everything still queued,
+        then stops the writer task.
+        """
+        self._stopped = True
+        if self._task is None:
+            return
+        self._closing = True
+        self._has_data.set()
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, rows: list[dict]) -> dict:
+        """
+        Validates rows (cached sensor registry + thresholds) and enqueues
+        the accepted readings. Returns the per-row summary; accepted rows
+        are reported as "queued".
+        """
+        sensors = await async_db.get_cached_sensors([r["sensor_id"] for r in rows])
+        readings, alerts, results = prepare_readings(rows, sensors)
+        if readings:
+            await self.put(readings, alerts)
+        for result in results:
+            if result["status"] == "success":
+                result["status"] = "queued"
+        return {
+            "accepted": len(readings),
+            "rejected": len(rows) - len(readings),
+            "alerts_created": len(alerts),
+            "results": results,
+        }
+
+    async def put(self, readings: list[dict], alerts: list[dict]):
+        """Enqueues one frame of prepared readings and their alerts."""
+        if self._stopped:
+            raise IngestQueueStopped("Ingest queue is stopped")
+        self.start()
+        count = len(readings)
+        deadline = time.monotonic() + self.block_timeout
+        while self._pending and self._pending + count > self.max_pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._stats["rejected"] += count
+                raise IngestQueueFull(
+                    f"Ingest queue full ({self._pending}/{self.max_pending} readings pending)"
+                )
+            self._space.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._space.wait(), remaining)
+        self._frames.append((readings, alerts))
+        self._pending += count
+        self._stats["enqueued"] += count
+        self._stats["max_depth"] = max(self._stats["max_depth"], self._pending)
+        self._has_data.set()
+        if self._pending >= self.batch_size:
+            self._batch_ready.set()
+
+    def _take_batch(self) -> tuple[list[dict], list[dict]]:
+        readings: list[dict] = []
+        alerts: list[dict] = []
+        while self._frames and (
+            not readings or len(readings) + len(self._frames[0][0]) <= self.batch_size
+        ):
+            frame_readings, frame_alerts = self._frames.popleft()
+            readings.extend(frame_readings)
+            alerts.extend(frame_alerts)
+        self._pending -= len(readings)
+        if not self._frames:
+            self._has_data.clear()
+        if self._pending < self.batch_size:
+            self._batch_ready.clear()
+        self._space.set()
+        return readings, alerts
+
+    async def _flush(self, readings: list[dict], alerts: list[dict]) -> bool:
+        started = time.perf_counter()
+        try:
+            await async_db.run(self.writer, readings, alerts)
+            self._stats["flushed_readings"] += len(readings)
+            ok = True
+        except Exception as e:
+            self._stats["write_errors"] += 1
+            logger.exception(f"Ingest flush of {len(readings)} readings failed: {e}")
+            ok = False
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._stats["flushes"] += 1
+        self._stats["flush_latency_ms_last"] = latency_ms
+        self._stats["flush_latency_ms_total"] += latency_ms
+        self._stats["flush_latency_ms_max"] = max(
+            self._stats["flush_latency_ms_max"], latency_ms
+        )
+        return ok
+
+    async def _write(self, readings: list[dict], alerts: list[dict]):
+        """Flushes a batch, retrying with backoff; spools it if all attempts fail."""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._stats["retries"] += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            if await self._flush(readings, alerts):
+                if self.spool.exists():
+                    await self._replay_spool()
+                return
+        await asyncio.to_thread(self._spool_batch, readings, alerts)
+        self._stats["spooled_readings"] += len(readings)
+        logger.error(f"Spooled {len(readings)} unwritten readings to {self.spool}.")
+
+    def _spool_batch(self, readings: list[dict], alerts: list[dict]):
+        self.spool.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spool, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"readings": readings, "alerts": alerts}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_spool(self) -> list[str]:
+        with open(self.spool, encoding="utf-8") as f:
+            return [line for line in f if line.strip()]
+
+    def _rewrite_spool(self, lines: list[str]):
+        tmp = self.spool.with_name(self.spool.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool)
+
+    async def _replay_spool(self):
+        """
+        Writes spooled batches back, oldest first. Stops at the first failure
+        and keeps the rest for the next attempt.
+        """
+        try:
+            lines = await asyncio.to_thread(self._read_spool)
+        except FileNotFoundError:
+            return
+        for i, line in enumerate(lines):
+            frame = json.loads(line)
+            try:
+                await async_db.run(self.writer, frame["readings"], frame["alerts"])
+            except Exception as e:
+                logger.exception(f"Ingest spool replay failed: {e}")
+                await asyncio.to_thread(self._rewrite_spool, lines[i:])
+                return
+            self._stats["replayed_readings"] += len(frame["readings"])
+        self.spool.unlink()
+        logger.info(f"Replayed {len(lines)} spooled ingest batches.")
+
+    async def _run(self):
+        if self.spool.exists():
+            await self._replay_spool()
+        while True:
+            await self._has_data.wait()
+            if not self._closing and self._pending < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._batch_ready.wait(), self.flush_interval
+                    )
+            if self._frames:
+                await self._write(*self._take_batch())
+            if self._closing and not self._frames:
+                return
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        flushes = s["flushes"]
+        s["depth"] = self._pending
+        s["max_pending"] = self.max_pending
+        s["running"] = self._task is not None and not self._task.done()
+        s["stopped"] = self._stopped
+        s["flush_latency_ms_avg"] = (
+            s["flush_latency_ms_total"] / flushes if flushes else 0.0
+        )
+        return s
+
+
+ingest_queue = IngestQueue(writer=DatabaseManager.insert_sensor_data_batch)
+
+
+@contextlib.asynccontextmanager
+async def ingest_queue_lifespan():
+    """Lifespan task: starts the writer and flushes pending readings on shutdown."""
+    ingest_queue.start()
+    try:
+        yield
+    finally:
+        await ingest_queue.stop()
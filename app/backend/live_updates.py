@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import threading
+from collections import OrderedDict
+
+
+class LiveUpdateHub:
+    """
+    In-process fan-out of sensor changes to dashboard sessions.
+
+    The write path calls `publish` after each commit (from any thread).
+    The hub keeps only the newest change per sensor, stamped with a
+    monotonically increasing version, so a subscriber asking for changes
+    since version V gets one entry per sensor that changed after V however
+    many readings arrived in between. Nothing is queued per subscriber and
+    slow sessions cannot make the hub grow.
+
+    Subscribers are coroutines awaiting `wait(since)`; publishing wakes
+    them on their own event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._alerts_version = 0
+        self._structure_version = 0
+        # sensor_id -> (version, change), oldest change first.
+        self._sensors: OrderedDict[int, tuple[int, dict]] = OrderedDict()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.publishes = 0
+
+    def publish(
+        self,
+        readings: list[dict] = (),
+        alerts_changed: bool = False,
+        structure_changed: bool = False,
+    ):
+        """
+        Records committed readings (sensor_id, value, timestamp), that the
+        set of unacknowledged alerts changed and/or that parcels or sensors
+        were created, edited or deleted, then wakes subscribers.
+        """
+        if not readings and not alerts_changed and not structure_changed:
+            return
+        with self._lock:
+            self.version += 1
+            self.publishes += 1
+            for reading in readings:
+                sensor_id = reading["sensor_id"]
+                current = self._sensors.get(sensor_id)
+                if current and current[1]["timestamp"] > reading["timestamp"]:
+                    continue
+                self._sensors[sensor_id] = (
+                    self.version,
+                    {
+                        "sensor_id": sensor_id,
+                        "value": reading["value"],
+                        "timestamp": reading["timestamp"],
+                    },
+                )
+                self._sensors.move_to_end(sensor_id)
+            if alerts_changed:
+                self._alerts_version = self.version
+            if structure_changed:
+                self._structure_version = self.version
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(event.set)
+
+    def changes_since(self, version: int) -> dict:
+        """
+        Returns {"version", "sensors": {sensor_id: change}, "alerts_changed",
+        "structure_changed"} for everything published after `version`.
+        """
+        with self._lock:
+            changed = {}
+            for sensor_id, (changed_at, change) in reversed(self._sensors.items()):
+                if changed_at <= version:
+                    break
+                changed[sensor_id] = change
+            return {
+                "version": self.version,
+                "sensors": changed,
+                "alerts_changed": self._alerts_version > version,
+                "structure_changed": self._structure_version > version,
+            }
+
+    async def wait(self, since: int, timeout: float) -> dict:
+        """
+        Waits up to `timeout` seconds for anything newer than `since` and
+        returns `changes_since(since)` (empty on timeout).
+        """
+        if self.version <= since:
+            event = asyncio.Event()
+            waiter = (asyncio.get_running_loop(), event)
+            with self._lock:
+                self._waiters.add(waiter)
+            try:
+                if self.version <= since:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(event.wait(), timeout)
+            finally:
+                with self._lock:
+                    self._waiters.discard(waiter)
+        return self.changes_since(since)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "publishes": self.publishes,
+                "subscribers": len(self._waiters),
+                "tracked_sensors": len(self._sensors),
+            }
+
+
+live_updates = LiveUpdateHub()
@@ -0,0 +1,74 @@
+"""
+Database maintenance commands.
+
+    python -m app.backend.maintenance rebuild-latest
+    python -m app.backend.maintenance rebuild-rollups
+    python -m app.backend.maintenance rebuild-counts
+    python -m app.backend.maintenance purge [--table sensor_data]
+"""
+
+import argparse
+import logging
+from app.backend.database import DatabaseManager
+from app.backend.retention import RETENTION_POLICY, RETENTION_TARGETS, purge_expired
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_latest(args: argparse.Namespace):
+    count = DatabaseManager.rebuild_sensor_latest()
+    logger.info(f"Rebuilt sensor_latest for {count} sensors.")
+
+
+def rebuild_rollups(args: argparse.Namespace):
+    count = DatabaseManager.rebuild_rollups()
+    logger.info(f"Rebuilt sensor_rollups ({count} buckets).")
+
+
+def rebuild_counts(args: argparse.Namespace):
+    counts = DatabaseManager.rebuild_counts()
+    logger.info(f"Rebuilt table_counts: {counts}")
+
+
+def purge(args: argparse.Namespace):
+    for result in purge_expired(RETENTION_POLICY, tables=args.table):
+        logger.info(
+            f"{result['table']}: deleted {result['deleted']} rows before "
+            f"{result['cutoff']} (archive: {result['archive']})"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.backend.maintenance",
+        description="Agrotech database maintenance.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    cmd = commands.add_parser(
+        "rebuild-latest", help="Rebuild sensor_latest from sensor_data."
+    )
+    cmd.set_defaults(handler=rebuild_latest)
+    cmd = commands.add_parser(
+        "rebuild-rollups", help="Recompute 1m/1h/1d rollups from sensor_data."
+    )
+    cmd.set_defaults(handler=rebuild_rollups)
+    cmd = commands.add_parser(
+        "rebuild-counts", help="Recount rows behind the cached table counts."
+    )
+    cmd.set_defaults(handler=rebuild_counts)
+    cmd = commands.add_parser(
+        "purge", help="Archive and delete rows past the retention policy."
+    )
+    cmd.add_argument("--table", action="append", choices=list(RETENTION_TARGETS))
+    cmd.set_defaults(handler=purge)
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = build_parser().parse_args(argv)
+    DatabaseManager.initialize_schema()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
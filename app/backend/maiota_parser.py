@@ -0,0 +1,179 @@
+"""
+Table-driven parser for MAIoTA frames (see MQTT_INTEGRATION.md):
+
+    Payload=CIoTA-D1=2603&D2=5411&D3=↓2465&D4=43&D5=580&D6=103&D7=1&
+
+Every `key=value` token is parsed once and remembered in a bounded token
+table, so a frame costs one split plus table lookups; the per-token work
+(key normalisation, `↓`/`%` stripping, float conversion, scaling) only runs
+for tokens not seen before. Sensor values repeat a lot, so the table stays
+small and hot.
+
+`parse_payloads` parses a batch column-wise with pyarrow compute kernels
+when pyarrow is installed; well-formed frames never touch Python per field.
+"""
+
+import logging
+import time
+from functools import partial
+from typing import NamedTuple, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+MAX_TOKENS = 65536
+MALFORMED_LOG_INTERVAL = 60.0
+# Below this many frames the per-frame parser beats the kernel call overhead.
+BATCH_MIN_FRAMES = 128
+
+
+class MaiotaFrame(NamedTuple):
+    """One parsed frame; fields missing from the payload are None."""
+
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    soil_moisture: Optional[float] = None
+    light: Optional[float] = None
+    co2: Optional[float] = None
+    cov: Optional[float] = None
+    nox: Optional[float] = None
+
+
+# Dx -> (position in MaiotaFrame, divisor)
+FIELDS = {
+    "D1": (0, 100.0),
+    "D2": (1, 100.0),
+    "D3": (2, 100.0),
+    "D4": (3, 10.0),
+    "D5": (4, None),
+    "D6": (5, None),
+    "D7": (6, None),
+}
+FIELD_NAMES = MaiotaFrame._fields
+_POSITIONS = range(len(FIELD_NAMES))
+# Pseudo positions for tokens that carry no value.
+_IGNORED = len(FIELD_NAMES)
+_MALFORMED = _IGNORED + 1
+_new_frame = tuple.__new__
+_make_frame = partial(_new_frame, MaiotaFrame)
+# Every field present, in order, digits only: the shape of a sensor frame
+# (the Payload= prefix and the trailing & may be missing).
+# parse_payloads converts these column-wise; anything else goes through
+# parse_payload, so both give the same frames.
+_WELL_FORMED = (
+    "^(Payload=)?CIoTA-D1=[0-9]+&D2=[0-9]+&D3=↓?[0-9]+&D4=[0-9]+&"
+    "D5=[0-9]+&D6=[0-9]+&D7=[0-9]+&?$"
+)
+_DIVISORS = [FIELDS[f"D{i}"][1] or 1.0 for i in range(1, len(FIELD_NAMES) + 1)]
+_divisor_column = {"frames": 0, "array": None}
+
+
+def parse_token(token: str) -> tuple[int, object]:
+    """
+    Parses one `key=value` token into (position, value). Tokens without a
+    known Dx key give (_IGNORED, None); known keys with an unparsable value
+    give (_MALFORMED, token).
+    """
+    key, sep, raw = token.partition("=")
+    if not sep:
+        return (_IGNORED, None)
+    field = FIELDS.get(key.rsplit("-", 1)[-1].strip())
+    if field is None:
+        return (_IGNORED, None)
+    try:
+        value = float(raw.replace("↓", "").replace("%", "").strip())
+    except ValueError:
+        return (_MALFORMED, token)
+    position, divisor = field
+    return (position, value / divisor if divisor else value)
+
+
+class _TokenTable(dict):
+    """token -> parse_token(token), filled on first lookup, cleared when full."""
+
+    def __missing__(self, token: str) -> tuple[int, object]:
+        if len(self) >= MAX_TOKENS:
+            self.clear()
+        parsed = self[token] = parse_token(token)
+        return parsed
+
+
+_tokens = _TokenTable()
+_malformed = {"frames": 0, "since_log": 0, "logged_at": 0.0}
+
+
+def _note_malformed(token: str):
+    # One warning per interval with a count, instead of a traceback per field.
+    _malformed["frames"] += 1
+    _malformed["since_log"] += 1
+    now = time.monotonic()
+    if now - _malformed["logged_at"] >= MALFORMED_LOG_INTERVAL:
+        logger.warning(
+            f"Skipped malformed MAIoTA fields in {_malformed['since_log']} frames "
+            f"(latest: {token!r})."
+        )
+        _malformed["since_log"] = 0
+        _malformed["logged_at"] = now
+
+
+def _body(payload: str) -> str:
+    if "Payload=" in payload:
+        payload = payload.split("Payload=")[1]
+    return payload.strip()
+
+
+def parse_payload(payload: str) -> MaiotaFrame:
+    """Parses one frame; malformed fields are skipped (and counted)."""
+    values = dict(map(_tokens.__getitem__, _body(payload).split("&")))
+    if _MALFORMED in values:
+        _note_malformed(values[_MALFORMED])
+    return _new_frame(MaiotaFrame, map(values.get, _POSITIONS))
+
+
+def _divisors(frames: int) -> "pa.Array":
+    """The per-field divisors repeated for `frames` frames (cached, grown x2)."""
+    if _divisor_column["frames"] < frames:
+        size = max(frames, 2 * _divisor_column["frames"])
+        _divisor_column["array"] = pa.array(_DIVISORS * size, pa.float64())
+        _divisor_column["frames"] = size
+    return _divisor_column["array"].slice(0, frames * len(_DIVISORS))
+
+
+def parse_payloads(payloads: list[str]) -> list[MaiotaFrame]:
+    """
+    Parses a batch of frames; same result as parse_payload per frame.
+    Well-formed frames are matched, split and converted to floats as Arrow
+    columns; the rest (and small batches, or no pyarrow) use parse_payload.
+    """
+    if pa is None or len(payloads) < BATCH_MIN_FRAMES:
+        return list(map(parse_payload, payloads))
+    payloads_array = pa.array(payloads, pa.string())
+    well_formed = pc.match_substring_regex(payloads_array, _WELL_FORMED)
+    text = payloads_array.filter(well_formed)
+    text = pc.replace_substring(text, "Payload=", "")
+    text = pc.replace_substring(text, "CIoTA-", "")
+    text = pc.utf8_rtrim(pc.replace_substring(text, "↓", ""), "&")
+    # "Dx=digits" tokens, seven per frame in field order.
+    tokens = pc.list_flatten(pc.split_pattern(text, "&"))
+    values = pc.cast(pc.utf8_slice_codeunits(tokens, 3), pa.float64())
+    values = pc.divide(values, _divisors(len(text))).to_pylist()
+    frames = map(_make_frame, zip(*[iter(values)] * len(FIELD_NAMES)))
+    if len(text) == len(payloads):
+        return list(frames)
+    return [
+        next(frames) if ok else parse_payload(payload)
+        for ok, payload in zip(well_formed.to_pylist(), payloads)
+    ]
+
+
+def frame_values(frame: MaiotaFrame) -> dict[str, float]:
+    """Returns {data_type: value} for the fields present in the frame."""
+    return {name: value for name, value in zip(FIELD_NAMES, frame) if value is not None}
+
+
+def parser_stats() -> dict:
+    return {"tokens": len(_tokens), "malformed_frames": _malformed["frames"]}
@@ -1,30 +1,80 @@
 import logging
+import os
+import signal
 import sys
-import requests
+from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
+import paho.mqtt.client as mqtt
 from app.backend import MAIoTALib
+from app.backend.database import DatabaseManager
+from app.backend.devices import DeviceRegistry
+from app.backend.ingest import ingest_readings
+from app.backend.maiota_parser import frame_values, parse_payload
+from app.backend.mqtt_workers import MessageWorkerPool, WorkerPoolConfig
+from app.backend.transport import BatchingTransport, TransportConfig
 
-API_BASE_URL = "http://localhost:8000/api"
+# "http" (default): frames are sent to the app's ingest API
+# (AGROTECH_TRANSPORT_BASE_URL) through the batching transport, so the web
+# process publishes them to its live hub and sparklines at once. "direct":
+# frames are written in-process through the shared ingest service (same
+# database as the app); the dashboard only sees them when its snapshot is
+# rebuilt, up to LIVE_UPDATE_TIMEOUT plus the snapshot TTL later.
+INGEST_MODE = os.environ.get("AGROTECH_INGEST_MODE", "http")
+INGEST_MODES = ("direct", "http")
+# Topic filters subscribed on the shared client (comma-separated); "+"
+# matches every MAIoTA box of the account. Devices are registered in the
+# devices table (topic -> parcel).
+MQTT_TOPICS = [
+    topic.strip()
+    for topic in os.environ.get("AGROTECH_MQTT_TOPICS", "Awi7LJfyyn6LPjg/+").split(",")
+    if topic.strip()
+]
+MQTT_QOS = 0
+# The box MAIoTALib subscribes to; gets the legacy Greenhouse mapping when
+# no device is registered.
+MAIOTA_TOPIC = "Awi7LJfyyn6LPjg/15046220"
 SENSOR_MAPPING: dict[str, int] = {}
+# force: importing database.py already configured the root logger.
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - [MQTT_EXT] - %(levelname)s - %(message)s",
     handlers=[logging.StreamHandler(sys.stdout)],
+    force=True,
 )
 logger = logging.getLogger(__name__)
+transport = BatchingTransport(TransportConfig.from_env(spool_path="spool/mqtt.ndjson"))
+
+
+def _fetch_parcels() -> list[dict]:
+    if INGEST_MODE == "direct":
+        return DatabaseManager.get_parcels()
+    resp = transport.get("/parcels")
+    if resp.status_code != 200:
+        logger.error("Failed to fetch parcels from API.")
+        return []
+    return resp.json()
+
+
+def _fetch_sensors(parcel_id: int) -> list[dict]:
+    if INGEST_MODE == "direct":
+        return DatabaseManager.get_sensors_by_parcel(parcel_id)
+    resp = transport.get(f"/parcels/{parcel_id}/sensors")
+    if resp.status_code != 200:
+        logger.error(f"Failed to fetch sensors for parcel {parcel_id}")
+        return []
+    return resp.json()
 
 
 def discover_sensors():
     """
-    Fetches existing sensors from the API and maps them to MAIoTA data types.
+    Fetches existing sensors (from the database, or from the API in "http"
+    mode) and maps them to MAIoTA data types.
     """
     global SENSOR_MAPPING
     try:
-        logger.info("Discovering sensors from Agrotech API...")
-        resp = requests.get(f"{API_BASE_URL}/parcels")
-        if resp.status_code != 200:
-            logger.error("Failed to fetch parcels from API.")
-            return
-        parcels = resp.json()
+        logger.info(f"Discovering sensors from Agrotech ({INGEST_MODE} mode)...")
+        parcels = _fetch_parcels()
         if not parcels:
             logger.warning("No parcels found in Agrotech system.")
             return
@@ -34,25 +84,20 @@ def discover_sensors():
         logger.info(
             f"Targeting Parcel: {target_parcel['name']} (ID: {target_parcel['id']})"
         )
-        resp = requests.get(f"{API_BASE_URL}/parcels/{target_parcel['id']}/sensors")
-        if resp.status_code == 200:
-            sensors = resp.json()
-            for sensor in sensors:
-                s_type = sensor["type"]
-                s_id = sensor["id"]
-                if s_type in [
-                    "temperature",
-                    "humidity",
-                    "soil_moisture",
-                    "light",
-                    "co2",
-                    "cov",
-                    "nox",
-                ]:
-                    SENSOR_MAPPING[s_type] = s_id
-                    logger.info(f"Mapped '{s_type}' -> Sensor ID {s_id}")
-        else:
-            logger.error(f"Failed to fetch sensors for parcel {target_parcel['id']}")
+        for sensor in _fetch_sensors(target_parcel["id"]):
+            s_type = sensor["type"]
+            s_id = sensor["id"]
+            if s_type in [
+                "temperature",
+                "humidity",
+                "soil_moisture",
+                "light",
+                "co2",
+                "cov",
+                "nox",
+            ]:
+                SENSOR_MAPPING[s_type] = s_id
+                logger.info(f"Mapped '{s_type}' -> Sensor ID {s_id}")
         if not SENSOR_MAPPING:
             logger.warning(
                 "No compatible sensors found in the target parcel. Data will not be saved."
@@ -61,77 +106,84 @@ def discover_sensors():
         logger.exception(f"Discovery failed: {e}")
 
 
+def _load_devices() -> dict[str, dict[str, int]]:
+    if INGEST_MODE == "direct":
+        devices = DatabaseManager.get_device_sensor_map()
+    else:
+        resp = transport.get("/devices/mappings")
+        resp.raise_for_status()
+        devices = resp.json()
+    if not devices:
+        discover_sensors()
+        if SENSOR_MAPPING:
+            devices = {MAIOTA_TOPIC: dict(SENSOR_MAPPING)}
+    return devices
+
+
+def _load_device(topic: str) -> dict[str, dict[str, int]]:
+    if INGEST_MODE == "direct":
+        return DatabaseManager.get_device_sensor_map(topic)
+    resp = transport.get(f"/devices/mappings?topic={quote(topic, safe='')}")
+    resp.raise_for_status()
+    return resp.json()
+
+
+device_registry = DeviceRegistry(loader=_load_devices, topic_loader=_load_device)
+
+
 def parse_maiota_payload(payload: str) -> dict[str, float]:
     """
     Parses the specific format:
     Payload=CIoTA-D1=2603&D2=5411&D3=2542&D4=43&D5=580&D6=103&D7=1&
     """
-    results = {}
-    try:
-        if "Payload=" in payload:
-            payload = payload.split("Payload=")[1]
-        clean_payload = payload.strip().rstrip("&")
-        parts = clean_payload.split("&")
-        raw_values = {}
-        for part in parts:
-            if "=" in part:
-                key, value = part.split("=", 1)
-                clean_val_str = value.replace("↓", "").replace("%", "").strip()
-                try:
-                    raw_values[key] = float(clean_val_str)
-                except ValueError:
-                    logger.exception(f"Could not parse value '{value}' for key '{key}'")
-                    continue
-        for key, val in raw_values.items():
-            k = key.split("-")[-1].strip() if "-" in key else key.strip()
-            if k == "D1":
-                results["temperature"] = val / 100.0
-            elif k == "D2":
-                results["humidity"] = val / 100.0
-            elif k == "D3":
-                results["soil_moisture"] = val / 100.0
-            elif k == "D4":
-                results["light"] = val / 10.0
-            elif k == "D5":
-                results["co2"] = val
-            elif k == "D6":
-                results["cov"] = val
-            elif k == "D7":
-                results["nox"] = val
-        return results
-    except Exception as e:
-        logger.exception(f"Failed to parse payload '{payload}': {e}")
-        return {}
-
-
-def post_reading(sensor_id: int, value: float, source_type: str):
-    """Sends the processed reading to the Agrotech API."""
-    url = f"{API_BASE_URL}/sensors/{sensor_id}/data"
-    payload = {
-        "value": value,
-        "raw": f"MAIoTA_{source_type.upper()}",
-        "timestamp": None,
-    }
-    try:
-        resp = requests.post(url, json=payload)
-        if resp.status_code == 200:
-            logger.info(f"SAVED [ID={sensor_id} {source_type.upper()}]: {value}")
-        else:
-            logger.warning(
-                f"API ERROR [ID={sensor_id}]: {resp.status_code} - {resp.text}"
-            )
-    except requests.exceptions.RequestException as e:
-        logger.exception(f"Connection error posting to API: {e}")
+    return frame_values(parse_payload(payload))
+
 
+def log_result(result: dict):
+    logger.info(
+        f"SAVED frame: {result['accepted']} readings, "
+        f"{result['alerts_created']} alerts, {result['rejected']} rejected"
+    )
+    for entry in result["results"]:
+        if entry["status"] != "success":
+            logger.warning(f"REJECTED [ID={entry['sensor_id']}]: {entry['message']}")
 
-def dispatch_data(data: dict[str, float]):
-    """Distributes parsed data to mapped sensors."""
-    for data_type, value in data.items():
-        if data_type in SENSOR_MAPPING:
-            sensor_id = SENSOR_MAPPING[data_type]
-            post_reading(sensor_id, value, data_type)
-        else:
-            pass
+
+def build_frame(
+    data: dict[str, float], sensors: dict[str, int], timestamp: str = None
+) -> list[dict]:
+    """Maps parsed data to {sensor_id, value, raw, timestamp} rows."""
+    timestamp = timestamp or datetime.now().isoformat()
+    return [
+        {
+            "sensor_id": sensors[data_type],
+            "value": value,
+            "raw": f"MAIoTA_{data_type.upper()}",
+            "timestamp": timestamp,
+        }
+        for data_type, value in data.items()
+        if data_type in sensors
+    ]
+
+
+def dispatch_data(data: dict[str, float], sensors: dict[str, int] = None):
+    """
+    Writes a parsed frame: in "direct" mode through ingest_readings (one
+    transaction, same threshold and alert rules as the REST API), in
+    "http" mode through the batching transport (coalesced with other
+    frames, retried and spooled while the API is down). `sensors` maps
+    data types to sensor IDs (default: the legacy SENSOR_MAPPING).
+    """
+    rows = build_frame(data, SENSOR_MAPPING if sensors is None else sensors)
+    if not rows:
+        return
+    if INGEST_MODE == "http":
+        transport.send(rows)
+        return
+    try:
+        log_result(ingest_readings(rows))
+    except Exception as e:
+        logger.exception(f"Failed to ingest frame: {e}")
 
 
 original_on_connect = MAIoTALib.client.on_connect
@@ -142,28 +194,84 @@ def extended_on_connect(client, userdata, flags, rc):
     if original_on_connect:
         original_on_connect(client, userdata, flags, rc)
     if rc == 0:
-        logger.info("Agrotech Extension: Connected to Broker. Ready to process data.")
+        # One client, many subscriptions; resubscribed on every reconnect.
+        client.subscribe([(topic, MQTT_QOS) for topic in MQTT_TOPICS])
+        if MAIOTA_TOPIC not in MQTT_TOPICS and any(
+            mqtt.topic_matches_sub(topic, MAIOTA_TOPIC) for topic in MQTT_TOPICS
+        ):
+            # MAIoTALib's on_connect subscribed its box too; with both
+            # subscriptions the broker delivers every frame twice.
+            client.unsubscribe(MAIOTA_TOPIC)
+        logger.info(
+            f"Agrotech Extension: Connected to Broker. Subscribed to {MQTT_TOPICS}."
+        )
+
+
+def parse_frame(
+    message: tuple[str, bytes],
+) -> Optional[tuple[dict[str, float], dict[str, int]]]:
+    """Resolves the device of a (topic, payload) message and parses the frame."""
+    topic, payload = message
+    sensors = device_registry.lookup(topic)
+    if not sensors:
+        return None
+    data = parse_maiota_payload(payload.decode("utf-8"))
+    return (data, sensors) if data else None
+
+
+def write_frame(frame: tuple[dict[str, float], dict[str, int]]):
+    dispatch_data(*frame)
+
+
+worker_pool = MessageWorkerPool(
+    parse=parse_frame, write=write_frame, config=WorkerPoolConfig.from_env()
+)
 
 
 def extended_on_message(client, userdata, msg):
+    """
+    Runs on paho's network thread: only hands the topic and payload to the
+    worker pool, so device lookup, parsing and writes never stall the MQTT
+    loop.
+    """
     if original_on_message:
         original_on_message(client, userdata, msg)
+    if not worker_pool.submit((msg.topic, msg.payload)):
+        logger.warning(f"Frame dropped (queue {worker_pool.config.policy}).")
+
+
+def run_loop(client):
+    """
+    Runs the MQTT loop with the worker pool; on Ctrl+C or SIGTERM the
+    client disconnects and queued frames are drained before exiting.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: client.disconnect())
+    worker_pool.start()
+    if INGEST_MODE == "http":
+        # Also replays readings spooled before the last shutdown.
+        transport.start()
     try:
-        payload_str = str(msg.payload.decode("utf-8"))
-        parsed_data = parse_maiota_payload(payload_str)
-        if parsed_data:
-            dispatch_data(parsed_data)
-    except Exception as e:
-        logger.exception(f"Error in extended message processing: {e}")
+        client.loop_forever()
+    except KeyboardInterrupt:
+        client.disconnect()
+    finally:
+        worker_pool.stop()
+        logger.info(f"MQTT worker stats: {worker_pool.stats()}")
+        logger.info(f"Device stats: {device_registry.stats()}")
+        if INGEST_MODE == "http":
+            transport.stop()
+            logger.info(f"Transport stats: {transport.stats()}")
 
 
 if __name__ == "__main__":
     print("Initializing Agrotech MQTT Integration...")
-    discover_sensors()
+    if INGEST_MODE not in INGEST_MODES:
+        sys.exit(f"AGROTECH_INGEST_MODE must be one of {INGEST_MODES}.")
+    if INGEST_MODE == "direct":
+        DatabaseManager.initialize_schema()
+    device_registry.refresh()
     MAIoTALib.client.on_connect = extended_on_connect
     MAIoTALib.client.on_message = extended_on_message
-    import paho.mqtt.client as mqtt
-
     _original_loop_forever = mqtt.Client.loop_forever
 
     def mock_loop_forever(
@@ -177,8 +285,8 @@ if __name__ == "__main__":
 
     mqtt.Client.loop_forever = _original_loop_forever
     print("Agrotech: Injecting extended callbacks...")
-    discover_sensors()
+    device_registry.refresh()
     MAIoTALib.client.on_connect = extended_on_connect
     MAIoTALib.client.on_message = extended_on_message
     print("Agrotech: Starting Main Loop...")
-    MAIoTALib.client.loop_forever()
\ No newline at end of file
+    run_loop(MAIoTALib.client)
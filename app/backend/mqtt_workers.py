@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+QUEUE_POLICIES = ("block", "drop_oldest", "drop_newest")
+STAGES = ("queue", "parse", "write")
+LATENCY_WINDOW = 1024
+
+
+@dataclass(frozen=True)
+class WorkerPoolConfig:
+    """
+    Handoff between the MQTT network thread and the frame workers.
+
+    `queue_size` frames can wait for `workers` threads. When the queue is
+    full the policy decides: "drop_oldest" discards the oldest waiting frame
+    (newest data wins), "drop_newest" discards the incoming one and "block"
+    makes the network thread wait up to `block_timeout` seconds before
+    dropping it. On shutdown workers keep draining for up to `drain_timeout`
+    seconds.
+    """
+
+    workers: int = 2
+    queue_size: int = 1000
+    policy: str = "drop_oldest"
+    block_timeout: float = 1.0
+    drain_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls, prefix: str = "AGROTECH_MQTT_") -> "WorkerPoolConfig":
+        """
+        Builds a config with overrides from environment variables,
+        e.g. AGROTECH_MQTT_WORKERS=4.
+        """
+        overrides = {}
+        for name, field in cls.__dataclass_fields__.items():
+            raw = os.environ.get(f"{prefix}{name.upper()}")
+            if raw is None:
+                continue
+            try:
+                overrides[name] = type(field.default)(raw)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {prefix}{name.upper()}={raw!r}")
+        if overrides.get("policy", cls.policy) not in QUEUE_POLICIES:
+            logger.warning(f"Ignoring invalid {prefix}POLICY={overrides['policy']!r}")
+            overrides.pop("policy")
+        return cls(**overrides)
+
+
+class _LatencyStats:
+    """Count, mean, max and p95 (over the last samples) of one stage, in ms."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self._recent.append(ms)
+
+    def summary(self) -> dict:
+        recent = sorted(self._recent)
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count if self.count else 0.0,
+            "p95_ms": recent[int(len(recent) * 0.95)] if recent else 0.0,
+            "max_ms": self.max,
+        }
+
+
+class MessageWorkerPool:
+    """
+    Bounded queue between paho's on_message callback and worker threads.
+
+    `submit` only enqueues the raw message, so the network loop never waits
+    on parsing or on the database/API (except under the "block" policy,
+    and then at most `block_timeout`). Workers run `parse(message)` and,
+    when it returns something truthy, `write(frame)`, timing each stage.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[Any], Any],
+        write: Callable[[Any], None],
+        config: WorkerPoolConfig = WorkerPoolConfig(),
+    ):
+        self.parse = parse
+        self.write = write
+        self.config = config
+        self._items: deque[tuple[float, Any]] = deque()
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closing = False
+        self._busy = 0
+        self._latency = {stage: _LatencyStats() for stage in STAGES}
+        self._stats = {
+            "submitted": 0,
+            "processed": 0,
+            "dropped": 0,
+            "errors": 0,
+            "max_depth": 0,
+        }
+
+    def start(self):
+        """Starts the worker threads (idempotent)."""
+        with self._cond:
+            if self._threads:
+                return
+            self._closing = False
+            for i in range(max(1, self.config.workers)):
+                thread = threading.Thread(
+                    target=self._run, name=f"mqtt-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        Stops accepting frames, lets the workers drain the queue for up to
+        `timeout` seconds (default: config.drain_timeout) and returns the
+        number of frames left undone.
+        """
+        timeout = self.config.drain_timeout if timeout is None else timeout
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            left = len(self._items) + self._busy
+            self._stats["dropped"] += len(self._items)
+            self._items.clear()
+            self._threads = [t for t in self._threads if t.is_alive()]
+        if left:
+            logger.warning(f"MQTT workers stopped with {left} frames not processed.")
+        return left
+
+    def submit(self, message: Any) -> bool:
+        """Hands a message to the workers. Returns False when it was dropped."""
+        with self._cond:
+            if self._closing:
+                self._stats["dropped"] += 1
+                return False
+            self._stats["submitted"] += 1
+            if len(self._items) >= self.config.queue_size:
+                if self.config.policy == "drop_oldest":
+                    self._items.popleft()
+                    self._stats["dropped"] += 1
+                else:
+                    has_space = self.config.policy == "block" and self._cond.wait_for(
+                        lambda: len(self._items) < self.config.queue_size
+                        or self._closing,
+                        self.config.block_timeout,
+                    )
+                    if not has_space or self._closing:
+                        self._stats["dropped"] += 1
+                        return False
+            self._items.append((time.perf_counter(), message))
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._items or self._closing)
+                if not self._items:
+                    return
+                enqueued_at, message = self._items.popleft()
+                self._busy += 1
+                # Wakes a producer blocked on a full queue.
+                self._cond.notify_all()
+            try:
+                self._process(enqueued_at, message)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+
+    def _process(self, enqueued_at: float, message: Any):
+        started = time.perf_counter()
+        timings = {"queue": (started - enqueued_at) * 1000}
+        try:
+            frame = self.parse(message)
+            parsed = time.perf_counter()
+            timings["parse"] = (parsed - started) * 1000
+            if frame:
+                self.write(frame)
+                timings["write"] = (time.perf_counter() - parsed) * 1000
+        except Exception as e:
+            with self._cond:
+                self._stats["errors"] += 1
+            logger.exception(f"MQTT frame processing failed: {e}")
+            return
+        with self._cond:
+            self._stats["processed"] += 1
+            for stage, ms in timings.items():
+                self._latency[stage].add(ms)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "depth": len(self._items),
+                "in_flight": self._busy,
+                "workers": len(self._threads),
+                "policy": self.config.policy,
+                "queue_size": self.config.queue_size,
+                "latency": {
+                    stage: latency.summary() for stage, latency in self._latency.items()
+                },
+            }
@@ -0,0 +1,259 @@
+"""
+Query-plan regression guard for DatabaseManager.
+
+Runs every DatabaseManager read path against a scratch database, captures
+the SQL it actually executes and checks `EXPLAIN QUERY PLAN` for scans of
+the large tables, including full index scans, not listed in ALLOWED_SCANS.
+Run it after touching queries or indexes:
+
+    python -m app.backend.query_plans
+
+Exits with status 1 and lists the offending queries if any plan regressed.
+"""
+
+import re
+import sys
+import sqlite3
+import logging
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from app.backend import database
+from app.backend.database import DatabaseManager
+from app.backend.retention import RetentionPolicy, purge_expired
+
+logger = logging.getLogger(__name__)
+
+# Tables that grow with ingest and must always be reached through an index.
+GUARDED_TABLES = {"sensor_data", "alerts", "maiota_records", "sensor_rollups"}
+
+# Scans of guarded tables that are intended, as (case, table): reason. Any
+# other SCAN of a guarded table fails, including full index scans.
+ALLOWED_SCANS = {
+    ("get_alerts", "alerts"): "newest first over idx_alerts_ts, LIMIT",
+    ("get_filtered_alerts[none]", "alerts"): "newest first over idx_alerts_ts, LIMIT",
+    ("fetch_records", "maiota_records"): "newest first over the ts index, LIMIT",
+    ("get_counts[exact]", "maiota_records"): "an exact recount counts every row",
+}
+
+_TABLE_REF_RE = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|ON|LEFT|JOIN|INNER|ORDER|GROUP|LIMIT)(\w+))?",
+    re.IGNORECASE,
+)
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+def _seed_history(start: str, readings: int = 60) -> int:
+    """Creates a sensor with one reading per minute from `start`."""
+    sensor_id = DatabaseManager.create_sensor(
+        DatabaseManager.create_parcel("plan check", "l"), "t", "u", "d"
+    )
+    day, _, _ = start.partition("T")
+    DatabaseManager.insert_sensor_data_batch(
+        [
+            {
+                "sensor_id": sensor_id,
+                "value": float(i % 7),
+                "timestamp": f"{day}T{i // 60:02d}:{i % 60:02d}:00",
+            }
+            for i in range(readings)
+        ]
+    )
+    return sensor_id
+
+
+def _query_cases() -> list[tuple[str, Callable]]:
+    """DatabaseManager calls whose SQL is checked. Keep in sync with the class."""
+    start, end = "2024-01-01T00:00:00", "2024-01-02T00:00:00"
+    seeded: dict[str, int] = {}
+
+    def history_sensor() -> int:
+        # Seeded on first use so the downsampling paths have rows to reduce.
+        if "id" not in seeded:
+            seeded["id"] = _seed_history(start)
+        return seeded["id"]
+
+    return [
+        ("get_sensor_data", lambda: DatabaseManager.get_sensor_data(1)),
+        (
+            "get_sensor_data_history",
+            lambda: DatabaseManager.get_sensor_data_history(1, start, end),
+        ),
+        (
+            "get_sensor_data_history[open]",
+            lambda: DatabaseManager.get_sensor_data_history(1),
+        ),
+        ("get_latest_readings", DatabaseManager.get_latest_readings),
+        (
+            # A negative budget walks every resolution on the empty database.
+            "get_sensor_rollup_history",
+            lambda: DatabaseManager.get_sensor_rollup_history(
+                1, start, end, max_points=-1
+            ),
+        ),
+        ("get_alerts", DatabaseManager.get_alerts),
+        ("get_unacknowledged_alerts", DatabaseManager.get_unacknowledged_alerts),
+        ("get_filtered_alerts[none]", DatabaseManager.get_filtered_alerts),
+        (
+            "get_filtered_alerts[sensor]",
+            lambda: DatabaseManager.get_filtered_alerts(sensor_id=1),
+        ),
+        (
+            "get_filtered_alerts[sensor,type]",
+            lambda: DatabaseManager.get_filtered_alerts(
+                sensor_id=1, type_="THRESHOLD_HIGH"
+            ),
+        ),
+        (
+            "get_filtered_alerts[acknowledged]",
+            lambda: DatabaseManager.get_filtered_alerts(acknowledged=False),
+        ),
+        (
+            "get_filtered_alerts[dates]",
+            lambda: DatabaseManager.get_filtered_alerts(start_date=start, end_date=end),
+        ),
+        ("get_sensor_history_batch", DatabaseManager.get_sensor_history_batch),
+        ("fetch_records", lambda: DatabaseManager.fetch_records(10, 0)),
+        (
+            "fetch_records_page",
+            lambda: DatabaseManager.fetch_records_page(
+                10, DatabaseManager.encode_cursor(end, 100)
+            ),
+        ),
+        (
+            "get_sensor_data_page",
+            lambda: DatabaseManager.get_sensor_data_page(
+                1, 10, DatabaseManager.encode_cursor(end, 100), start
+            ),
+        ),
+        ("count_records", DatabaseManager.count_records),
+        (
+            "fetch_records search",
+            lambda: DatabaseManager.fetch_records(10, 0, "soil moist"),
+        ),
+        (
+            "fetch_records_page search",
+            lambda: DatabaseManager.fetch_records_page(10, search_query="soil"),
+        ),
+        (
+            "count_records search",
+            lambda: DatabaseManager.count_records("soil", exact=True),
+        ),
+        ("search_records", lambda: DatabaseManager.search_records("soil")),
+        ("get_system_stats", DatabaseManager.get_system_stats),
+        ("get_counts[exact]", lambda: DatabaseManager.get_counts(exact=True)),
+        (
+            "iter_sensor_data",
+            lambda: list(DatabaseManager.iter_sensor_data([1, 2], start, end)),
+        ),
+        ("iter_alerts", lambda: list(DatabaseManager.iter_alerts([1], start, end))),
+        ("get_device_sensor_map", DatabaseManager.get_device_sensor_map),
+        (
+            "get_device_sensor_map[topic]",
+            lambda: DatabaseManager.get_device_sensor_map("box/1"),
+        ),
+        (
+            "get_sensor_history_downsampled[lttb]",
+            lambda: DatabaseManager.get_sensor_history_downsampled(
+                history_sensor(), start, end, max_points=10
+            ),
+        ),
+        (
+            "get_sensor_history_downsampled[minmax]",
+            lambda: DatabaseManager.get_sensor_history_downsampled(
+                history_sensor(), start, end, max_points=10, method="minmax"
+            ),
+        ),
+        # Last: creates a sensor so the per-sensor sensor_data purge runs.
+        (
+            "purge_expired",
+            lambda: (
+                DatabaseManager.create_sensor(
+                    DatabaseManager.create_parcel("p", "l"), "t", "u", "d"
+                ),
+                purge_expired(RetentionPolicy(archive_dir="")),
+            ),
+        ),
+    ]
+
+
+def _table_aliases(sql: str) -> dict[str, str]:
+    aliases = {}
+    for table, alias in _TABLE_REF_RE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def find_full_scans(
+    conn: sqlite3.Connection, sql: str, allowed: frozenset[str] = frozenset()
+) -> list[str]:
+    """
+    Returns the plan lines that SCAN a guarded table, with or without an
+    index, unless the table is in `allowed`. SEARCH lines are never flagged.
+    """
+    aliases = _table_aliases(sql)
+    offending = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[3]
+        match = _SCAN_RE.match(detail)
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table in GUARDED_TABLES and table not in allowed:
+            offending.append(detail)
+    return offending
+
+
+def check_query_plans() -> dict[str, list[str]]:
+    """
+    Runs all query cases against a fresh scratch database.
+    Returns {case name: [offending plan lines]} for cases that scan a
+    guarded table outside ALLOWED_SCANS.
+    """
+    original_db = database.DB_FILE_NAME
+    failures: dict[str, list[str]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE_NAME = str(Path(tmp) / "plan_check.db")
+        DatabaseManager.reset_pool()
+        captured: list[str] = []
+        DatabaseManager.get_pool().on_connect.append(
+            lambda conn: conn.set_trace_callback(captured.append)
+        )
+        try:
+            DatabaseManager.initialize_schema()
+            for name, call in _query_cases():
+                captured.clear()
+                call()
+                statements = [
+                    s
+                    for s in captured
+                    if s.lstrip().upper().startswith(("SELECT", "WITH"))
+                ]
+                allowed = frozenset(
+                    table for case, table in ALLOWED_SCANS if case == name
+                )
+                with DatabaseManager.get_connection() as conn:
+                    conn.set_trace_callback(None)
+                    for sql in statements:
+                        offending = find_full_scans(conn, sql, allowed)
+                        if offending:
+                            failures.setdefault(name, []).extend(offending)
+                    conn.set_trace_callback(captured.append)
+        finally:
+            DatabaseManager.reset_pool()
+            database.DB_FILE_NAME = original_db
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_query_plans()
+    if failures:
+        for name, lines in failures.items():
+            print(f"FULL SCAN in {name}: {'; '.join(lines)}")
+        sys.exit(1)
+    print(
+        f"OK: {len(_query_cases())} DatabaseManager queries use index searches "
+        f"({len(ALLOWED_SCANS)} allowed scans)."
+    )
@@ -0,0 +1,199 @@
+import contextlib
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from app.backend.database import DatabaseManager, RETENTION_TARGETS
+
+logger = logging.getLogger(__name__)
+# Same format as CURRENT_TIMESTAMP defaults. Rows stored as ISO timestamps
+# ("T" separator) sort after a same-day cutoff, so they are kept slightly
+# longer, never purged early.
+CUTOFF_FORMAT = "%Y-%m-%d %H:%M:%S"
+_TRUE = ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    How long rows are kept, per table (days; 0 keeps them forever).
+
+    Raw sensor_data can expire early because sensor_rollups keep the 1m/1h/1d
+    aggregates; only acknowledged alerts expire. Expired rows are appended
+    to gzip-compressed NDJSON files under `archive_dir` before they are
+    deleted ("" deletes without archiving). Rows are removed in batches of
+    `batch_size`, each its own short write transaction, with `batch_pause`
+    seconds between batches so ingest is never blocked for long.
+
+    The app only purges on its own (every `interval` seconds) when `enabled`
+    is set, e.g. AGROTECH_RETENTION_ENABLED=1; `python -m
+    app.backend.maintenance purge` applies the policy on demand.
+    """
+
+    enabled: bool = False
+    sensor_data_days: int = 90
+    alerts_days: int = 365
+    maiota_records_days: int = 365
+    batch_size: int = 5000
+    batch_pause: float = 0.05
+    archive_dir: str = "archive"
+    interval: float = 3600.0
+
+    @classmethod
+    def from_env(cls, prefix: str = "AGROTECH_RETENTION_") -> "RetentionPolicy":
+        """
+        Builds a policy with overrides from environment variables,
+        e.g. AGROTECH_RETENTION_SENSOR_DATA_DAYS=30.
+        """
+        overrides = {}
+        for name, field in cls.__dataclass_fields__.items():
+            raw = os.environ.get(f"{prefix}{name.upper()}")
+            if raw is None:
+                continue
+            try:
+                if isinstance(field.default, bool):
+                    overrides[name] = raw.strip().lower() in _TRUE
+                else:
+                    overrides[name] = type(field.default)(raw)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {prefix}{name.upper()}={raw!r}")
+        return cls(**overrides)
+
+    def days(self, table: str) -> int:
+        return getattr(self, f"{table}_days")
+
+
+RETENTION_POLICY = RetentionPolicy.from_env()
+
+
+class _Archive:
+    """Lazily opened gzip NDJSON file for one table and run."""
+
+    def __init__(self, archive_dir: str, table: str, cutoff: str):
+        self.path = None
+        if archive_dir:
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+            self.path = (
+                Path(archive_dir)
+                / table
+                / f"{table}-before-{cutoff[:10]}-{stamp}.ndjson.gz"
+            )
+        self._file = None
+
+    def write(self, rows: list[dict]):
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+        for row in rows:
+            self._file.write(json.dumps(row) + "\n")
+        # Rows must be on disk before the transaction that deletes them.
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def purge_table(
+    table: str, cutoff: str, policy: RetentionPolicy = RETENTION_POLICY
+) -> dict:
+    """
+    Archives and deletes rows of `table` older than `cutoff`
+    (CUTOFF_FORMAT). Returns {"table", "cutoff", "deleted", "archive"}.
+
+    Archiving is at-least-once: a crash between writing a batch and
+    committing its delete archives that batch again on the next run.
+    """
+    archive = _Archive(policy.archive_dir, table, cutoff)
+    deleted = 0
+    try:
+        for partition in DatabaseManager.get_retention_partitions(table):
+            while True:
+                count = DatabaseManager.purge_expired_batch(
+                    table, cutoff, policy.batch_size, partition, archive.write
+                )
+                deleted += count
+                if count < policy.batch_size:
+                    break
+                time.sleep(policy.batch_pause)
+    finally:
+        archive.close()
+    if deleted:
+        logger.info(f"Retention: deleted {deleted} rows from {table} before {cutoff}.")
+    return {
+        "table": table,
+        "cutoff": cutoff,
+        "deleted": deleted,
+        "archive": str(archive.path) if deleted and archive.path else None,
+    }
+
+
+def purge_expired(
+    policy: RetentionPolicy = RETENTION_POLICY,
+    now: Optional[datetime] = None,
+    tables: Optional[list[str]] = None,
+) -> list[dict]:
+    """Applies the policy to every table (or `tables`) with a retention period."""
+    now = now or datetime.now()
+    results = []
+    for table in tables or RETENTION_TARGETS:
+        days = policy.days(table)
+        if days > 0:
+            cutoff = (now - timedelta(days=days)).strftime(CUTOFF_FORMAT)
+            results.append(purge_table(table, cutoff, policy))
+    return results
+
+
+class RetentionScheduler:
+    """Background thread running purge_expired every `policy.interval` seconds."""
+
+    def __init__(self, policy: RetentionPolicy = RETENTION_POLICY):
+        self.policy = policy
+        self.last_result: Optional[list[dict]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts the thread if the policy is enabled (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self.policy.enabled or self.policy.interval <= 0:
+            logger.info("Retention scheduler disabled (AGROTECH_RETENTION_ENABLED).")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.policy.interval):
+            try:
+                self.last_result = purge_expired(self.policy)
+            except Exception as e:
+                logger.exception(f"Retention run failed: {e}")
+
+
+retention_scheduler = RetentionScheduler()
+
+
+@contextlib.asynccontextmanager
+async def retention_lifespan():
+    """Lifespan task: runs the retention job while the app is up, if enabled."""
+    retention_scheduler.start()
+    try:
+        yield
+    finally:
+        retention_scheduler.stop()
@@ -5,6 +5,7 @@ from app.backend.database import DatabaseManager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+MAIOTA_DEVICE_TOPIC = "Awi7LJfyyn6LPjg/15046220"
 
 
 def seed_agrotech_db():
@@ -151,6 +152,16 @@ def seed_agrotech_db():
                 }
             )
         logger.info("Sensors already exist, using existing IDs.")
+    if not DatabaseManager.get_devices():
+        greenhouse = next(
+            (p for p in DatabaseManager.get_parcels() if "Greenhouse" in p["name"]),
+            None,
+        )
+        if greenhouse:
+            DatabaseManager.create_device(
+                MAIOTA_DEVICE_TOPIC, greenhouse["id"], name="MAIoTA Greenhouse"
+            )
+            logger.info(f"Registered MAIoTA device {MAIOTA_DEVICE_TOPIC}")
     logger.info("Generating historical sensor data...")
     now = datetime.now()
     if created_sensors and (
@@ -195,4 +206,4 @@ def seed_agrotech_db():
 
 
 if __name__ == "__main__":
-    seed_agrotech_db()
\ No newline at end of file
+    seed_agrotech_db()
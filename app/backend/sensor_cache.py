@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Optional
+
+_MISSING = object()
+
+
+class SensorRegistry:
+    """
+    Process-wide, size-bounded LRU cache of sensor rows keyed by sensor ID.
+
+    Sensor configuration rarely changes, so the ingest path reads existence
+    and thresholds from here instead of querying SQLite per reading.
+    DatabaseManager invalidates entries on sensor/parcel CRUD; `ttl` bounds
+    staleness for writes made by other processes. Unknown IDs are cached
+    too (as None) so bad gateway IDs don't hit the database every time.
+    Cached rows are shared: callers must treat them as read-only.
+
+    Loads run outside the lock. Every invalidation bumps a generation
+    counter, and rows loaded across a bump are returned but not cached, so
+    an invalidation racing a load can't leave a stale row for a whole TTL.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[list[int]], dict[int, dict]],
+        max_size: int = 10000,
+        ttl: float = 60.0,
+    ):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[Optional[dict], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+
+    def _lookup(self, sensor_id: int, now: float):
+        entry = self._entries.get(sensor_id)
+        if entry is None or now - entry[1] > self.ttl:
+            return _MISSING
+        self._entries.move_to_end(sensor_id)
+        return entry[0]
+
+    def _store(self, sensor_id: int, sensor: Optional[dict], now: float):
+        self._entries[sensor_id] = (sensor, now)
+        self._entries.move_to_end(sensor_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, sensor_id: int) -> Optional[dict]:
+        return self.get_many([sensor_id]).get(sensor_id)
+
+    def get_many(self, sensor_ids: list[int]) -> dict[int, dict]:
+        """Returns {sensor_id: row} for known sensors; loads misses in one call."""
+        found: dict[int, dict] = {}
+        missing: list[int] = []
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            for sensor_id in dict.fromkeys(sensor_ids):
+                sensor = self._lookup(sensor_id, now)
+                if sensor is _MISSING:
+                    missing.append(sensor_id)
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    if sensor is not None:
+                        found[sensor_id] = sensor
+        if missing:
+            loaded = self.loader(missing)
+            now = time.monotonic()
+            with self._lock:
+                cacheable = generation == self._generation
+                for sensor_id in missing:
+                    sensor = loaded.get(sensor_id)
+                    if cacheable:
+                        self._store(sensor_id, sensor, now)
+                    if sensor is not None:
+                        found[sensor_id] = sensor
+        return found
+
+    def invalidate(self, sensor_id: Optional[int] = None):
+        """Drops one sensor, or the whole cache when sensor_id is None."""
+        with self._lock:
+            self.invalidations += 1
+            self._generation += 1
+            if sensor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sensor_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -3,6 +3,8 @@ import random
 import requests
 import sys
 import logging
+from datetime import datetime
+from app.backend.transport import BatchingTransport, TransportConfig
 
 logging.basicConfig(
     level=logging.INFO,
@@ -10,22 +12,20 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)],
 )
 logger = logging.getLogger(__name__)
-API_BASE_URL = "http://localhost:8000/api"
 SIMULATION_INTERVAL = 5
-PARCELS_ENDPOINT = f"{API_BASE_URL}/parcels"
-
-
-def get_sensor_url(sensor_id: int) -> str:
-    return f"{API_BASE_URL}/sensors/{sensor_id}/data"
+PARCELS_ENDPOINT = "/parcels"
 
 
 def get_sensors_url(parcel_id: int) -> str:
-    return f"{API_BASE_URL}/parcels/{parcel_id}/sensors"
+    return f"/parcels/{parcel_id}/sensors"
 
 
 class SensorSimulator:
-    def __init__(self):
+    def __init__(self, transport: BatchingTransport = None):
         self.active_sensors: list[dict] = []
+        self.transport = transport or BatchingTransport(
+            TransportConfig.from_env(spool_path="spool/simulator.ndjson")
+        )
 
     def fetch_configuration(self):
         """
@@ -34,7 +34,7 @@ class SensorSimulator:
         """
         try:
             logger.info("Fetching system configuration...")
-            resp = requests.get(PARCELS_ENDPOINT)
+            resp = self.transport.get(PARCELS_ENDPOINT)
             if resp.status_code != 200:
                 logger.error(f"Failed to fetch parcels. Status: {resp.status_code}")
                 return
@@ -43,7 +43,7 @@ class SensorSimulator:
             self.active_sensors = []
             for parcel in parcels:
                 p_id = parcel["id"]
-                resp = requests.get(get_sensors_url(p_id))
+                resp = self.transport.get(get_sensors_url(p_id))
                 if resp.status_code == 200:
                     sensors = resp.json()
                     for s in sensors:
@@ -58,7 +58,7 @@ class SensorSimulator:
             )
         except requests.exceptions.ConnectionError as e:
             logger.exception(
-                f"Could not connect to API. Is the Agrotech server running at http://localhost:8000? Error: {e}"
+                f"Could not connect to API. Is the Agrotech server running at {self.transport.config.base_url}? Error: {e}"
             )
             sys.exit(1)
         except Exception as e:
@@ -113,29 +113,31 @@ class SensorSimulator:
         )
         try:
             while True:
+                timestamp = datetime.now().isoformat()
+                readings = []
                 for sensor in self.active_sensors:
                     s_id = sensor["id"]
-                    s_type = sensor["type"]
-                    val = self.generate_value(s_type, last_values.get(s_id))
+                    val = self.generate_value(sensor["type"], last_values.get(s_id))
                     last_values[s_id] = val
-                    payload = {"value": val, "raw": f"SIM_{int(time.time())}"}
-                    try:
-                        resp = requests.post(get_sensor_url(s_id), json=payload)
-                        if resp.status_code == 200:
-                            logger.info(
-                                f"SENT [Sensor {s_id} | {s_type}]: {val} {sensor.get('unit', '')}"
-                            )
-                        else:
-                            logger.warning(
-                                f"FAILED [Sensor {s_id}]: API returned {resp.status_code}"
-                            )
-                    except Exception as e:
-                        logger.exception(f"ERROR sending to Sensor {s_id}: {e}")
+                    readings.append(
+                        {
+                            "sensor_id": s_id,
+                            "value": val,
+                            "raw": f"SIM_{int(time.time())}",
+                            "timestamp": timestamp,
+                        }
+                    )
+                # One tick of every sensor goes out as a single batch request.
+                self.transport.send(readings)
+                logger.info(f"QUEUED {len(readings)} readings")
                 time.sleep(SIMULATION_INTERVAL)
         except KeyboardInterrupt as e:
             logger.exception(f"Simulation stopped by user: {e}")
+        finally:
+            self.transport.stop()
+            logger.info(f"Transport stats: {self.transport.stats()}")
 
 
 if __name__ == "__main__":
     sim = SensorSimulator()
-    sim.run()
\ No newline at end of file
+    sim.run()
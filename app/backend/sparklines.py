@@ -0,0 +1,155 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Optional
+
+SPARKLINE_POINTS = 20
+
+
+class SparklineBuffer:
+    """
+    Last `capacity` readings per sensor, kept in memory for the dashboard
+    sparklines instead of re-running a window query over sensor_data.
+
+    The write path appends committed readings; every point gets a global,
+    increasing sequence number so a client that has seen everything up to
+    seq N only needs the points after N (`since`). The buffer is filled
+    from the database (`loader(limit)` -> {sensor_id: [{value, timestamp}]})
+    on first use and reconciled with it on demand (`history(reconcile=True)`),
+    which picks up readings written by other processes. Points are keyed by
+    timestamp per sensor, so a reading seen both in memory and in the
+    database is kept once and keeps its sequence number.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[int], dict[int, list[dict]]],
+        capacity: int = SPARKLINE_POINTS,
+    ):
+        self.loader = loader
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._rings: dict[int, deque[tuple[int, str, float]]] = {}
+        self._loaded = False
+        # Readings appended while the first load runs; merged when it ends.
+        self._pending: Optional[list[dict]] = None
+        self.seq = 0
+        self.reconciles = 0
+
+    def _merge(self, sensor_id: int, points: list[tuple[str, float]]):
+        """Adds (timestamp, value) points not in the ring yet; keeps time order."""
+        ring = self._rings.get(sensor_id)
+        if ring is None:
+            ring = self._rings[sensor_id] = deque(maxlen=self.capacity)
+        seen = {p[1] for p in ring}
+        added = []
+        for timestamp, value in points:
+            if timestamp in seen:
+                continue
+            seen.add(timestamp)
+            self.seq += 1
+            added.append((self.seq, timestamp, value))
+        if not added:
+            return
+        if not ring or ring[-1][1] <= min(p[1] for p in added):
+            ring.extend(sorted(added, key=lambda p: p[1]))
+            return
+        # Late points: keep the ring in time order.
+        merged = sorted([*ring, *added], key=lambda p: p[1])
+        ring.clear()
+        ring.extend(merged[-self.capacity :])
+
+    def _load(self):
+        """Reads the newest points from the database and merges them in."""
+        with self._load_lock:
+            with self._lock:
+                if not self._loaded:
+                    self._pending = []
+            try:
+                fresh = self.loader(self.capacity)
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for sensor_id, points in fresh.items():
+                    self._merge(
+                        sensor_id, [(p["timestamp"], p["value"]) for p in points]
+                    )
+                for reading in self._pending or ():
+                    self._merge(
+                        reading["sensor_id"], [(reading["timestamp"], reading["value"])]
+                    )
+                self._pending = None
+                if self._loaded:
+                    self.reconciles += 1
+                self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load()
+
+    def append(self, readings: list[dict]):
+        """Adds committed readings (sensor_id, value, timestamp)."""
+        with self._lock:
+            if not self._loaded:
+                if self._pending is not None:
+                    self._pending.extend(readings)
+                # Otherwise the first load reads them from the database.
+                return
+            for reading in readings:
+                self._merge(
+                    reading["sensor_id"], [(reading["timestamp"], reading["value"])]
+                )
+
+    def discard(self, sensor_id: Optional[int] = None):
+        """
+        Drops one sensor's ring, or reloads everything when None. Sequence
+        numbers keep increasing, so clients must dedupe points by timestamp.
+        """
+        with self._lock:
+            if sensor_id is None:
+                self._rings.clear()
+                self._loaded = False
+            else:
+                self._rings.pop(sensor_id, None)
+
+    def history(self, reconcile: bool = False) -> tuple[int, dict[int, list[dict]]]:
+        """
+        Returns (seq, {sensor_id: [{value, timestamp}, ...]}) in time order.
+        `reconcile` first merges in what the database has (one indexed query).
+        """
+        if reconcile:
+            self._load()
+        else:
+            self._ensure_loaded()
+        with self._lock:
+            return self.seq, {
+                sensor_id: [{"value": v, "timestamp": ts} for _, ts, v in ring]
+                for sensor_id, ring in self._rings.items()
+            }
+
+    def since(self, seq: int) -> tuple[int, dict[int, list[list]]]:
+        """
+        Returns (current seq, {sensor_id: [[seq, timestamp, value], ...]})
+        with only the points newer than `seq`, compact for the wire.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            changed = {}
+            for sensor_id, ring in self._rings.items():
+                if not ring or max(p[0] for p in ring) <= seq:
+                    continue
+                changed[sensor_id] = [list(p) for p in ring if p[0] > seq]
+            return self.seq, changed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "seq": self.seq,
+                "sensors": len(self._rings),
+                "capacity": self.capacity,
+                "reconciles": self.reconciles,
+            }
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """
+    SQLite tuning applied to every pooled connection.
+
+    Defaults target concurrent ingest + dashboard reads: WAL lets readers
+    proceed while a writer commits, and synchronous=NORMAL is durable across
+    application crashes (only the last transactions may roll back on power
+    loss).
+    """
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64000
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000
+    wal_autocheckpoint: int = 1000
+    journal_size_limit: int = 64 * 1024 * 1024
+    checkpoint_interval: float = 60.0
+    checkpoint_truncate_bytes: int = 128 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls, prefix: str = "AGROTECH_DB_") -> "StorageProfile":
+        """
+        Builds a profile with overrides from environment variables,
+        e.g. AGROTECH_DB_SYNCHRONOUS=FULL or AGROTECH_DB_MMAP_SIZE=0.
+        """
+        overrides = {}
+        for name, field in cls.__dataclass_fields__.items():
+            raw = os.environ.get(f"{prefix}{name.upper()}")
+            if raw is None:
+                continue
+            default = field.default
+            try:
+                overrides[name] = type(default)(raw)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {prefix}{name.upper()}={raw!r}")
+        return cls(**overrides)
+
+    @property
+    def uses_wal(self) -> bool:
+        return self.journal_mode.upper() == "WAL"
+
+    def apply(self, conn: sqlite3.Connection):
+        """Applies the PRAGMAs to a connection. Safe to call repeatedly."""
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        mode = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0]
+        if mode.upper() != self.journal_mode.upper():
+            logger.warning(
+                f"Requested journal_mode={self.journal_mode} but SQLite kept {mode}"
+            )
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        conn.execute(f"PRAGMA journal_size_limit = {int(self.journal_size_limit)}")
+        if self.uses_wal:
+            conn.execute(f"PRAGMA wal_autocheckpoint = {int(self.wal_autocheckpoint)}")
+
+
+class WalCheckpointScheduler:
+    """
+    Background thread that checkpoints the WAL on a fixed interval.
+
+    SQLite's auto-checkpoint is PASSIVE and can be starved by a continuous
+    stream of readers, so the WAL may keep growing. This runs a PASSIVE
+    checkpoint every `interval` seconds and escalates to TRUNCATE once the
+    WAL file exceeds `truncate_bytes`.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable,
+        wal_path: str,
+        interval: float = 60.0,
+        truncate_bytes: int = 128 * 1024 * 1024,
+    ):
+        self.connection_factory = connection_factory
+        self.wal_path = wal_path
+        self.interval = interval
+        self.truncate_bytes = truncate_bytes
+        self.last_result: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="wal-checkpoint", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def checkpoint(self, mode: Optional[str] = None) -> dict:
+        """Runs one checkpoint and returns SQLite's (busy, log, checkpointed)."""
+        if mode is None:
+            mode = "TRUNCATE" if self.wal_size() > self.truncate_bytes else "PASSIVE"
+        with self.connection_factory() as conn:
+            busy, log_frames, checkpointed = conn.execute(
+                f"PRAGMA wal_checkpoint({mode})"
+            ).fetchone()
+        self.last_result = {
+            "mode": mode,
+            "busy": busy,
+            "log_frames": log_frames,
+            "checkpointed_frames": checkpointed,
+            "wal_bytes": self.wal_size(),
+        }
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except sqlite3.Error as e:
+                logger.warning(f"WAL checkpoint failed: {e}")
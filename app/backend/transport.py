@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+# Statuses worth retrying; any other error response rejects the batch for good.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """
+    Client side of the ingest API, shared by the MQTT connector ("http"
+    mode) and the simulator.
+
+    Readings are coalesced into POST /sensors/data:batch requests of up to
+    `batch_size` readings; a reading waits at most `max_latency` seconds
+    before its batch is sent. Failed requests are retried `max_retries`
+    times with full-jitter exponential backoff (`backoff_base` doubling up
+    to `backoff_max`). Batches that still fail are appended to the spool
+    file and replayed every `replay_interval` seconds once the API answers
+    again, including after a restart.
+    """
+
+    base_url: str = "http://localhost:8000/api"
+    batch_size: int = 500
+    max_latency: float = 1.0
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 15.0
+    timeout: float = 10.0
+    pool_size: int = 4
+    spool_path: str = "spool/readings.ndjson"
+    replay_interval: float = 30.0
+
+    @classmethod
+    def from_env(
+        cls, prefix: str = "AGROTECH_TRANSPORT_", **defaults
+    ) -> "TransportConfig":
+        """
+        Builds a config from `defaults` with overrides from environment
+        variables, e.g. AGROTECH_TRANSPORT_BASE_URL=http://agrotech:8000/api.
+        """
+        overrides = dict(defaults)
+        for name, field in cls.__dataclass_fields__.items():
+            raw = os.environ.get(f"{prefix}{name.upper()}")
+            if raw is None:
+                continue
+            try:
+                overrides[name] = type(field.default)(raw)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {prefix}{name.upper()}={raw!r}")
+        return cls(**overrides)
+
+
+class BatchingTransport:
+    """
+    Sends readings to the ingest API over one keep-alive requests.Session.
+
+    `send` only buffers; a background thread posts the batches, so callers
+    never wait on the network. While the API is unreachable batches go
+    straight to the spool file (one JSON list of readings per line) instead
+    of being retried one by one. Delivery is at-least-once: a crash during
+    a replay sends the replayed batches again.
+    """
+
+    def __init__(self, config: TransportConfig = TransportConfig()):
+        self.config = config
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.spool = Path(config.spool_path)
+        self._replay_file = self.spool.with_name(self.spool.name + ".replay")
+        self._cond = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._buffer: list[dict] = []
+        self._deadline = 0.0
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self._offline = False
+        self._last_replay = 0.0
+        self._stats = {
+            "sent_batches": 0,
+            "sent_readings": 0,
+            "retries": 0,
+            "rejected_readings": 0,
+            "spooled_readings": 0,
+            "replayed_readings": 0,
+        }
+
+    def url(self, path: str) -> str:
+        return f"{self.config.base_url}{path}"
+
+    def get(self, path: str) -> requests.Response:
+        """GET on the API through the shared session (e.g. for discovery)."""
+        return self.session.get(self.url(path), timeout=self.config.timeout)
+
+    def start(self):
+        """Starts the sender thread (idempotent)."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._closing = False
+            self._thread = threading.Thread(
+                target=self._run, name="ingest-transport", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Sends (or spools) everything buffered, then closes the session."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            leftover, self._buffer = self._buffer, []
+        if leftover:
+            self._spool_batch(leftover)
+        self.session.close()
+
+    def send(self, readings: list[dict]):
+        """Buffers {sensor_id, value, timestamp, raw} readings for sending."""
+        if not readings:
+            return
+        self.start()
+        with self._cond:
+            was_empty = not self._buffer
+            if was_empty:
+                self._deadline = time.monotonic() + self.config.max_latency
+            self._buffer.extend(readings)
+            # The sender sleeps without a timeout while the buffer is empty:
+            # wake it to arm the max_latency deadline, or to send a full batch.
+            if was_empty or len(self._buffer) >= self.config.batch_size:
+                self._cond.notify_all()
+
+    def _take_batch(self) -> list[dict]:
+        with self._cond:
+            batch = self._buffer[: self.config.batch_size]
+            del self._buffer[: self.config.batch_size]
+            self._deadline = time.monotonic() + self.config.max_latency
+            return batch
+
+    def _run(self):
+        self._replay_spool()
+        while True:
+            with self._cond:
+                while not self._closing:
+                    if len(self._buffer) >= self.config.batch_size:
+                        break
+                    now = time.monotonic()
+                    if self._buffer and now >= self._deadline:
+                        break
+                    replay_in = self._last_replay + self.config.replay_interval - now
+                    if replay_in <= 0 and self._has_spool():
+                        break
+                    waits = [replay_in] if self._has_spool() else []
+                    if self._buffer:
+                        waits.append(self._deadline - now)
+                    self._cond.wait(min(waits) if waits else None)
+                closing = self._closing
+                pending = bool(self._buffer)
+            if pending:
+                self._deliver(self._take_batch())
+            elif self._has_spool() and not closing:
+                self._replay_spool()
+            if closing and not self._buffer:
+                return
+
+    def _deliver(self, batch: list[dict]):
+        if self._offline:
+            self._spool_batch(batch)
+            return
+        if self._post(batch, self.config.max_retries):
+            if self._has_spool():
+                self._replay_spool()
+        else:
+            self._offline = True
+            self._last_replay = time.monotonic()
+            self._spool_batch(batch)
+
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.config.backoff_max, self.config.backoff_base * 2**attempt)
+        return random.uniform(0, cap)
+
+    def _post(self, batch: list[dict], retries: int) -> bool:
+        """
+        Posts one batch. Returns True once the API answered (accepted, or
+        rejected for good), False when it stayed unreachable.
+        """
+        for attempt in range(retries + 1):
+            try:
+                resp = self.session.post(
+                    self.url("/sensors/data:batch"),
+                    json={"readings": batch},
+                    timeout=self.config.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Ingest API unreachable: {e}")
+            else:
+                if resp.status_code == 200:
+                    result = resp.json()
+                    self._stats["sent_batches"] += 1
+                    self._stats["sent_readings"] += result["accepted"]
+                    self._stats["rejected_readings"] += result["rejected"]
+                    logger.info(
+                        f"SENT batch: {result['accepted']} readings, "
+                        f"{result['alerts_created']} alerts, {result['rejected']} rejected"
+                    )
+                    return True
+                if resp.status_code not in RETRY_STATUSES:
+                    self._stats["rejected_readings"] += len(batch)
+                    logger.error(
+                        f"API rejected a batch of {len(batch)} readings: "
+                        f"{resp.status_code} - {resp.text}"
+                    )
+                    return True
+                logger.warning(f"API ERROR: {resp.status_code} - {resp.text}")
+            if attempt < retries and not self._closing:
+                self._stats["retries"] += 1
+                time.sleep(self._backoff(attempt))
+            elif self._closing:
+                break
+        return False
+
+    def _has_spool(self) -> bool:
+        return self.spool.exists() or self._replay_file.exists()
+
+    def _spool_batch(self, batch: list[dict]):
+        self._spool_lines([json.dumps(batch)])
+        self._stats["spooled_readings"] += len(batch)
+        logger.warning(f"Spooled {len(batch)} readings to {self.spool}.")
+
+    def _spool_lines(self, lines: list[str]):
+        with self._spool_lock:
+            self.spool.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool, "a", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _replay_spool(self):
+        """
+        Resends spooled batches, oldest first. The spool is renamed before
+        replaying so new failures can be spooled meanwhile; whatever is not
+        delivered is appended back.
+        """
+        self._last_replay = time.monotonic()
+        with self._spool_lock:
+            if not self._replay_file.exists():
+                if not self.spool.exists():
+                    self._offline = False
+                    return
+                self.spool.rename(self._replay_file)
+        with open(self._replay_file, encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f if line.strip()]
+        for i, line in enumerate(lines):
+            batch = json.loads(line)
+            if not self._post(batch, 0):
+                self._offline = True
+                self._spool_lines(lines[i:])
+                break
+            self._stats["replayed_readings"] += len(batch)
+        else:
+            self._offline = False
+        self._replay_file.unlink()
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._buffer)
+        return {
+            **self._stats,
+            "pending": pending,
+            "offline": self._offline,
+            "spool": self._has_spool(),
+        }
@@ -1,6 +1,7 @@
 import reflex as rx
 from datetime import datetime, timedelta
 import logging
+from app.backend.async_db import async_db
 from app.backend.database import DatabaseManager
 from app.models.data_models import Sensor, EnrichedAlert
 
@@ -20,22 +21,22 @@ class AlertsState(rx.State):
     @rx.event
     def load_initial_data(self):
         self.sensors = DatabaseManager.get_sensors()
-        self.load_alerts()
+        return AlertsState.load_alerts
 
     @rx.event
     def set_filter_sensor(self, value: str):
         self.filter_sensor_id = value
-        self.load_alerts()
+        return AlertsState.load_alerts
 
     @rx.event
     def set_filter_type(self, value: str):
         self.filter_type = value
-        self.load_alerts()
+        return AlertsState.load_alerts
 
     @rx.event
     def set_filter_acknowledged(self, value: str):
         self.filter_acknowledged = value
-        self.load_alerts()
+        return AlertsState.load_alerts
 
     @rx.event
     async def load_alerts(self):
@@ -48,15 +49,15 @@ class AlertsState(rx.State):
                 ack_filter = True
             elif self.filter_acknowledged == "unacknowledged":
                 ack_filter = False
-            self.alerts = DatabaseManager.get_filtered_alerts(
+            self.alerts = await async_db.get_filtered_alerts(
                 sensor_id=sid,
                 type_=self.filter_type,
                 acknowledged=ack_filter,
                 limit=100,
             )
             self.total_alerts = len(self.alerts)
-            unacked = DatabaseManager.get_unacknowledged_alerts()
-            self.pending_alerts = len(unacked)
+            counts = await async_db.get_counts()
+            self.pending_alerts = counts["unacknowledged_alerts"]
         except Exception as e:
             logger.exception(f"Failed to load alerts: {e}")
             self.alerts = []
@@ -66,6 +67,6 @@ class AlertsState(rx.State):
     def acknowledge_alert(self, alert_id: int):
         try:
             DatabaseManager.acknowledge_alert(alert_id)
-            self.load_alerts()
+            return AlertsState.load_alerts
         except Exception as e:
-            logger.exception(f"Failed to ack alert: {e}")
\ No newline at end of file
+            logger.exception(f"Failed to ack alert: {e}")
@@ -1,6 +1,7 @@
 import reflex as rx
 from datetime import datetime, timedelta
 import logging
+from app.backend.async_db import async_db
 from app.backend.database import DatabaseManager
 from app.models.data_models import Sensor
 
@@ -20,22 +21,22 @@ class AnalyticsState(rx.State):
         self.sensors = DatabaseManager.get_sensors()
         if self.sensors and (not self.selected_sensor_id):
             self.selected_sensor_id = str(self.sensors[0]["id"])
-        self.load_history()
+        return AnalyticsState.load_history
 
     @rx.event
     def set_sensor(self, value: str):
         self.selected_sensor_id = value
-        self.load_history()
+        return AnalyticsState.load_history
 
     @rx.event
     def set_start_date(self, value: str):
         self.start_date = value
-        self.load_history()
+        return AnalyticsState.load_history
 
     @rx.event
     def set_end_date(self, value: str):
         self.end_date = value
-        self.load_history()
+        return AnalyticsState.load_history
 
     @rx.event
     async def load_history(self):
@@ -52,11 +53,10 @@ class AnalyticsState(rx.State):
         s_ts = f"{self.start_date}T00:00:00"
         e_ts = f"{self.end_date}T23:59:59"
         try:
-            data = DatabaseManager.get_sensor_data_history(
-                s_id, start_date=s_ts, end_date=e_ts, limit=500
+            self.chart_data = await async_db.get_sensor_history_downsampled(
+                s_id, start_date=s_ts, end_date=e_ts, max_points=500, method="lttb"
             )
-            self.chart_data = sorted(data, key=lambda x: x["timestamp"])
         except Exception as e:
             logger.exception(f"Failed to load history: {e}")
             self.chart_data = []
-        self.is_loading = False
\ No newline at end of file
+        self.is_loading = False
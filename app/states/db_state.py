@@ -2,6 +2,7 @@ import reflex as rx
 import asyncio
 import logging
 from datetime import datetime
+from app.backend.async_db import async_db
 from app.backend.database import DatabaseManager
 from app.backend.MAIoTALib import MAIOTA_DATA
 from app.models.data_models import DatabaseStatus, MaiotaRecord
@@ -26,6 +27,8 @@ class DatabaseState(rx.State):
     page: int = 1
     page_size: int = 10
     total_records: int = 0
+    next_cursor: str = ""
+    _page_cursors: list[str] = []
 
     @rx.var
     def total_pages(self) -> int:
@@ -33,7 +36,7 @@ class DatabaseState(rx.State):
 
     @rx.var
     def has_next_page(self) -> bool:
-        return self.page < self.total_pages
+        return self.next_cursor != ""
 
     @rx.var
     def has_prev_page(self) -> bool:
@@ -41,18 +44,25 @@ class DatabaseState(rx.State):
 
     @rx.event
     async def load_records(self):
-        """Fetches records based on current page and search query."""
-        status = DatabaseManager.check_status()
+        """
+        Fetches the current page with keyset pagination: page N starts at the
+        cursor saved when page N-1 was loaded. The total is only recounted
+        on the first page.
+        """
+        status = await async_db.check_status()
         if not status["table_exists"]:
             self.records = []
             self.total_records = 0
             return
         try:
-            offset = (self.page - 1) * self.page_size
-            self.records = DatabaseManager.fetch_records(
-                limit=self.page_size, offset=offset, search_query=self.search_query
+            cursor = self._page_cursors[self.page - 2] if self.page > 1 else None
+            result = await async_db.fetch_records_page(
+                limit=self.page_size, cursor=cursor, search_query=self.search_query
             )
-            self.total_records = DatabaseManager.count_records(self.search_query)
+            self.records = result["items"]
+            self.next_cursor = result["next_cursor"] or ""
+            if self.page == 1:
+                self.total_records = await async_db.count_records(self.search_query)
         except Exception as e:
             logging.exception(f"Error loading records: {e}")
             self._add_log(f"Error loading records: {str(e)}")
@@ -62,11 +72,15 @@ class DatabaseState(rx.State):
         """Updates search query and resets to first page."""
         self.search_query = query
         self.page = 1
+        self._page_cursors = []
         return DatabaseState.load_records
 
     @rx.event
     def next_page(self):
         if self.has_next_page:
+            self._page_cursors = self._page_cursors[: self.page - 1] + [
+                self.next_cursor
+            ]
             self.page += 1
             return DatabaseState.load_records
 
@@ -184,4 +198,4 @@ class DatabaseState(rx.State):
         except Exception as e:
             logging.exception(f"On mount error: {e}")
             self._add_log(f"On mount error: {str(e)}")
-        self.is_loading = False
\ No newline at end of file
+        self.is_loading = False
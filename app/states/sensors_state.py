@@ -2,9 +2,17 @@ import reflex as rx
 import asyncio
 import logging
 from datetime import datetime
+from app.backend.async_db import async_db
+from app.backend.dashboard import dashboard_snapshots, sensor_status
 from app.backend.database import DatabaseManager
+from app.backend.live_updates import live_updates
+from app.backend.sparklines import SPARKLINE_POINTS
 from app.models.data_models import EnrichedParcel, Alert
 
+LIVE_UPDATE_TIMEOUT = 10
+# Pause after a failed refresh, so a persistent error doesn't spin the loop.
+LIVE_RETRY_DELAY = 1.0
+
 
 class SensorsState(rx.State):
     """
@@ -16,11 +24,16 @@ class SensorsState(rx.State):
     is_loading: bool = False
     last_updated: str = "-"
     auto_refresh_active: bool = True
+    _live_version: int = 0
+    _live_running: bool = False
+    _snapshot_version: int = 0
+    _sparkline_seq: int = 0
 
     @rx.event
     async def fetch_dashboard_data(self):
         """
-        Fetches all necessary data for the dashboard:
+        Loads the dashboard from the shared snapshot (built at most once
+        per ingest generation for all sessions):
         - Parcels and their sensors
         - Latest readings
         - Sparkline history
@@ -29,57 +42,8 @@ class SensorsState(rx.State):
         self.is_loading = True
         yield
         try:
-            parcels = DatabaseManager.get_parcels()
-            all_sensors = DatabaseManager.get_sensors()
-            latest_readings = DatabaseManager.get_latest_readings()
-            readings_map = {r["sensor_id"]: r for r in latest_readings}
-            history_map = DatabaseManager.get_sensor_history_batch(limit=20)
-            self.active_alerts = DatabaseManager.get_unacknowledged_alerts()
-            enriched_parcels = []
-            for p in parcels:
-                p_id = p["id"]
-                p_sensors = [s for s in all_sensors if s["parcel_id"] == p_id]
-                enriched_sensors = []
-                for s in p_sensors:
-                    s_id = s["id"]
-                    reading = readings_map.get(s_id)
-                    history = history_map.get(s_id, [])
-                    status = "inactive"
-                    status_color = "gray"
-                    val = None
-                    if reading:
-                        val = reading["value"]
-                        status = "active"
-                        status_color = "green"
-                        if (
-                            val is not None
-                            and s["threshold_high"] is not None
-                            and (val > s["threshold_high"])
-                        ):
-                            status = "critical"
-                            status_color = "red"
-                        elif (
-                            val is not None
-                            and s["threshold_low"] is not None
-                            and (val < s["threshold_low"])
-                        ):
-                            status = "warning"
-                            status_color = "yellow"
-                    enriched_sensors.append(
-                        {
-                            **s,
-                            "current_value": val,
-                            "latest_timestamp": reading["timestamp"]
-                            if reading
-                            else None,
-                            "status": status,
-                            "status_color": status_color,
-                            "history": history,
-                        }
-                    )
-                enriched_parcels.append({**p, "sensors": enriched_sensors})
-            self.parcels_data = enriched_parcels
-            self.last_updated = datetime.now().strftime("%H:%M:%S")
+            snapshot = await async_db.run(dashboard_snapshots.get)
+            self._apply_snapshot(snapshot)
         except Exception as e:
             logging.exception(f"Dashboard fetch error: {e}")
         self.is_loading = False
@@ -90,16 +54,122 @@ class SensorsState(rx.State):
         yield SensorsState.fetch_dashboard_data
         yield SensorsState.tick
 
-    @rx.event
+    def _apply_snapshot(self, snapshot: dict):
+        """Takes over a shared snapshot unless this session already shows it."""
+        if snapshot["version"] != self._snapshot_version:
+            self.parcels_data = snapshot["parcels"]
+            self.active_alerts = snapshot["active_alerts"]
+            self._snapshot_version = snapshot["version"]
+        self._live_version = snapshot["live_version"]
+        self._sparkline_seq = snapshot["sparkline_seq"]
+        self.last_updated = datetime.now().strftime("%H:%M:%S")
+
+    def _apply_live_changes(
+        self, changes: dict[int, dict], points: dict[int, list[list]]
+    ):
+        """
+        Updates only the sensors present in `changes`, merging their new
+        sparkline points ([seq, timestamp, value]) into the history. Points
+        are keyed by timestamp, so a point sent again (e.g. after the
+        buffer was reloaded) replaces itself instead of being duplicated.
+        """
+        parcels = []
+        for parcel in self.parcels_data:
+            if not any(s["id"] in changes for s in parcel["sensors"]):
+                parcels.append(parcel)
+                continue
+            sensors = []
+            for sensor in parcel["sensors"]:
+                change = changes.get(sensor["id"])
+                if change is None:
+                    sensors.append(sensor)
+                    continue
+                status, status_color = sensor_status(sensor, change["value"])
+                by_timestamp = {p["timestamp"]: p for p in sensor["history"]}
+                for _, timestamp, value in points.get(sensor["id"], []):
+                    by_timestamp[timestamp] = {"value": value, "timestamp": timestamp}
+                history = sorted(by_timestamp.values(), key=lambda p: p["timestamp"])
+                sensors.append(
+                    {
+                        **sensor,
+                        "current_value": change["value"],
+                        "latest_timestamp": change["timestamp"],
+                        "status": status,
+                        "status_color": status_color,
+                        "history": history[-SPARKLINE_POINTS:],
+                    }
+                )
+            parcels.append({**parcel, "sensors": sensors})
+        self.parcels_data = parcels
+
+    @rx.event(background=True)
     async def tick(self):
-        """Background task for auto-refresh."""
-        if self.auto_refresh_active:
-            await asyncio.sleep(30)
-            yield SensorsState.fetch_dashboard_data
-            yield SensorsState.tick
+        """
+        Live auto-refresh: waits for changes published by the ingest path
+        and applies only the sensors that changed since the last applied
+        version. Alerts are reloaded only when they changed. Writes from
+        other processes (MQTT connector, simulator, other workers) never
+        reach the in-process hub, so every quiet LIVE_UPDATE_TIMEOUT the
+        shared snapshot is re-read; it is rebuilt at most once per TTL.
+        """
+        async with self:
+            if self._live_running:
+                return
+            self._live_running = True
+        try:
+            while True:
+                async with self:
+                    if not self.auto_refresh_active:
+                        return
+                    since = self._live_version
+                try:
+                    await self._apply_next_change(since)
+                except Exception as e:
+                    # E.g. "database is locked": keep the session live.
+                    logging.exception(f"Live refresh error: {e}")
+                    await asyncio.sleep(LIVE_RETRY_DELAY)
+        finally:
+            async with self:
+                self._live_running = False
+
+    async def _apply_next_change(self, since: int):
+        """
+        Waits for the next change after `since` and applies it, or re-reads
+        the shared snapshot after a quiet LIVE_UPDATE_TIMEOUT.
+        """
+        changes = await live_updates.wait(since, LIVE_UPDATE_TIMEOUT)
+        if changes["version"] == since:
+            snapshot = await async_db.run(dashboard_snapshots.get)
+            async with self:
+                if self._live_version == since:
+                    self._apply_snapshot(snapshot)
+            return
+        if changes["structure_changed"]:
+            snapshot = await async_db.run(dashboard_snapshots.get)
+            async with self:
+                self._apply_snapshot(snapshot)
+            return
+        sparklines = None
+        if changes["sensors"]:
+            sparklines = await async_db.get_sparkline_delta(self._sparkline_seq)
+        alerts = None
+        if changes["alerts_changed"]:
+            alerts = await async_db.get_unacknowledged_alerts()
+        async with self:
+            if self._live_version != since:
+                # A full fetch ran meanwhile; re-read from its version.
+                return
+            self._snapshot_version = 0
+            if sparklines is not None:
+                self._apply_live_changes(changes["sensors"], sparklines["points"])
+                self._sparkline_seq = sparklines["seq"]
+            if alerts is not None:
+                self.active_alerts = alerts
+            self._live_version = changes["version"]
+            self.last_updated = datetime.now().strftime("%H:%M:%S")
 
     @rx.event
     def acknowledge_alert(self, alert_id: int):
         """Marks an alert as acknowledged."""
         DatabaseManager.acknowledge_alert(alert_id)
-        return SensorsState.fetch_dashboard_data
\ No newline at end of file
+        return SensorsState.fetch_dashboard_data
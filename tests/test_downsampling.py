@@ -0,0 +1,23 @@
+import pytest
+from app.backend.downsampling import lttb
+
+
+def _points(count: int) -> list[tuple[float, str, float]]:
+    return [(float(i), f"t{i}", float(i % 7)) for i in range(count)]
+
+
+def test_keeps_first_and_last_within_threshold():
+    points = _points(1000)
+    sampled = list(lttb(points, len(points), 50))
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+
+
+@pytest.mark.parametrize("actual", [0, 1, 2, 10, 500, 1010])
+def test_tolerates_a_stale_total(actual):
+    # Rows deleted or inserted between the COUNT and the streamed SELECT.
+    points = _points(actual)
+    sampled = list(lttb(points, 1000, 50))
+    assert len(sampled) <= 50
+    if points:
+        assert sampled[0] == points[0] and sampled[-1] == points[-1]
@@ -0,0 +1,6 @@
+from app.backend.query_plans import check_query_plans
+
+
+def test_database_manager_queries_use_indexes():
+    # {case: offending plan lines}; see ALLOWED_SCANS for intended scans.
+    assert check_query_plans() == {}
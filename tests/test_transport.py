@@ -0,0 +1,64 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.backend.transport import BatchingTransport, TransportConfig
+
+
+class _IngestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.posts.put(body["readings"])
+        payload = json.dumps(
+            {"accepted": len(body["readings"]), "rejected": 0, "alerts_created": 0}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ingest_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _IngestHandler)
+    server.posts = queue.Queue()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _readings(count: int) -> list[dict]:
+    return [
+        {"sensor_id": 1, "value": float(i), "timestamp": f"2024-01-01T00:00:{i:02d}"}
+        for i in range(count)
+    ]
+
+
+def test_partial_batch_is_sent_within_max_latency(ingest_server, tmp_path):
+    config = TransportConfig(
+        base_url=f"http://127.0.0.1:{ingest_server.server_port}",
+        batch_size=500,
+        max_latency=0.2,
+        spool_path=str(tmp_path / "spool.ndjson"),
+    )
+    transport = BatchingTransport(config)
+    try:
+        # The second round starts with the sender idle on an empty buffer.
+        for _ in range(2):
+            sent_at = time.monotonic()
+            transport.send(_readings(10))
+            batch = ingest_server.posts.get(timeout=5)
+            assert len(batch) == 10
+            assert time.monotonic() - sent_at < config.max_latency + 0.5
+    finally:
+        transport.stop(timeout=5)
+    assert transport.stats()["sent_readings"] == 20
+    assert not transport.stats()["spool"]